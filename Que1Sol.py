@@ -1,4 +1,9 @@
+import argparse
+import math
 import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 weapons = ["Sword", "Bow", "Magic Staff"]
 keys = ["Golden Key", "Silver Key", "Bronze Key"]
@@ -8,75 +13,149 @@ riddles = [
     ("The more you take, the more you leave behind?", "footsteps"),
     ("I speak without a mouth and hear without ears. What am I?", "echo")
 ]
+correct_weapon = "Magic Staff"
+max_lives = 3
 
-def get_valid_input(prompt, options):
+def get_valid_input(prompt, options, read=input, write=print):
     """
     Display a message and get valid user input from a list of choices.
     :param prompt: The message to display.
     :param options: A list of choices for the user to pick from.
+    :param read: Function reading one line of input, input() by default.
+    :param write: Function displaying one message, print() by default.
     :return: The option chosen by the user.
     """
     while True:
         try:
-            print(prompt)
+            write(prompt)
             for i, option in enumerate(options, 1):
-                print(f"{i}. {option}")
-            choice = int(input("Enter the number corresponding to your choice: ").strip())
+                write(f"{i}. {option}")
+            choice = int(read("Enter the number corresponding to your choice: ").strip())
             if 1 <= choice <= len(options):
                 return options[choice - 1]
             else:
-                print(f"Invalid choice! Please select a number between 1 and {len(options)}.")
+                write(f"Invalid choice! Please select a number between 1 and {len(options)}.")
         except ValueError:
-            print("Invalid input! Please enter a number.")
+            write("Invalid input! Please enter a number.")
 
-def ask_riddle(riddle_data):
+class ConsoleIO:
+    """
+    Input/output strategy of an interactive game: messages are printed and the player's
+    choices and answers read line by line. Pass other read and write functions to script it.
+    """
+    def __init__(self, read=input, write=print):
+        self.read = read
+        self.write = write
+
+    def show(self, message):
+        self.write(message)
+
+    def choose(self, prompt, options):
+        return get_valid_input(prompt, options, self.read, self.write)
+
+    def answer(self, riddle):
+        return self.read("Answer: ")
+
+class ScriptedIO(ConsoleIO):
+    """
+    Input/output strategy replaying a fixed list of input lines and keeping the transcript.
+    """
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.transcript = []
+        super().__init__(self.read_line, self.transcript.append)
+
+    def read_line(self, prompt=""):
+        """
+        :param prompt: Ignored, like the prompt of input() it is not part of the transcript.
+        :return: The next scripted line, EOFError once they are exhausted, like input() at the end of stdin.
+        """
+        try:
+            return next(self.lines)
+        except StopIteration:
+            raise EOFError("No scripted input left.") from None
+
+class RandomPolicyIO:
+    """
+    Input/output strategy of a headless player: messages are dropped, options are picked at
+    random and riddles are answered with one of the known answers at random, or correctly
+    with probability `accuracy` when it is given.
+    """
+    answers = [answer for _, answer in riddles]
+    solutions = dict(riddles)
+
+    def __init__(self, rng, accuracy=None):
+        self.rng = rng
+        self.accuracy = accuracy
+
+    def show(self, message):
+        pass
+
+    def choose(self, prompt, options):
+        return self.rng.choice(options)
+
+    def answer(self, riddle):
+        if self.accuracy is None:
+            return self.rng.choice(self.answers)
+        if self.rng.random() < self.accuracy:
+            return self.solutions[riddle]
+        return ""
+
+def ask_riddle(riddle_data, io=None):
     """
     Display a riddle and check the user's answer.
     :param riddle_data: A tuple containing the riddle and its correct answer.
+    :param io: Input/output strategy, the console when omitted.
     :return: True if the answer is correct, False otherwise.
     """
+    io = io or ConsoleIO()
     riddle, correct_answer = riddle_data
-    print(f"Riddle: {riddle}")
-    user_answer = input("Answer: ").strip().lower()
+    io.show(f"Riddle: {riddle}")
+    user_answer = io.answer(riddle).strip().lower()
     return user_answer == correct_answer.lower()
 
-def select_weapon(weapons):
+def select_weapon(weapons, io=None):
     """
     Let the user choose a weapon from a list.
     :param weapons: A list of available weapons.
+    :param io: Input/output strategy, the console when omitted.
     :return: The chosen weapon.
     """
-    return get_valid_input("Choose a weapon from the list:", weapons)
+    return (io or ConsoleIO()).choose("Choose a weapon from the list:", weapons)
 
-def select_key(keys):
+def select_key(keys, io=None, rng=random):
     """
     Let the user choose a key from a shuffled list to add randomness.
     :param keys: A list of available keys.
+    :param io: Input/output strategy, the console when omitted.
+    :param rng: Random number generator, the random module when omitted.
     :return: The chosen key.
     """
-    shuffled_keys = random.sample(keys, len(keys))  # Shuffle keys to add randomness
-    return get_valid_input("Choose a key from the list:", shuffled_keys)
+    shuffled_keys = rng.sample(keys, len(keys))  # Shuffle keys to add randomness
+    return (io or ConsoleIO()).choose("Choose a key from the list:", shuffled_keys)
 
-def check_key(keys, chosen_key):
+def check_key(keys, chosen_key, rng=random):
     """
     Check if the chosen key is the correct one.
     :param keys: A list of available keys.
     :param chosen_key: The key chosen by the player.
+    :param rng: Random number generator, the random module when omitted.
     :return: True if the correct key is chosen, False otherwise.
     """
-    if random.choice(keys) == chosen_key:
+    if rng.choice(keys) == chosen_key:
         return True
     else:
         return False
 
-def check_lives(lives):
+def check_lives(lives, io=None):
     """
     Check if the player still has lives remaining.
     :param lives: The number of lives the player has left.
+    :param io: Input/output strategy, the console when omitted.
     :return: True if the player has lives remaining, False otherwise.
     """
     if lives <= 0:
-        print("Game Over! You've lost all your lives.")
+        (io or ConsoleIO()).show("Game Over! You've lost all your lives.")
         return False
     return True
 
@@ -89,97 +168,236 @@ def check_weapon(correct_weapon, chosen_weapon):
     """
     return chosen_weapon == correct_weapon
 
-def select_weapon_n_key(weapons, keys, lives):
+# States of a Game. WON and LOST end it.
+START = "start"
+LEVEL_1 = "level_1"
+CHOOSE_WEAPON = "choose_weapon"
+CHOOSE_KEY = "choose_key"
+LEVEL_2 = "level_2"
+FINAL_RIDDLE = "final_riddle"
+WON = "won"
+LOST = "lost"
+
+class Game:
     """
-    Handle the selection of both weapon and key for progressing through the game.
-    :param weapons: A list of available weapons.
-    :param keys: A list of available keys.
-    :param lives: The number of lives the player has left.
+    One playthrough as an explicit state machine: each state handler does one step of the
+    game and returns the next state, so going back to the weapon and key after a wrong
+    weapon is a transition instead of a recursive call.
+
+    The player has 3 lives, loses one per wrong riddle in Level 1 and loses the game with
+    none left. Entering Level 2 grants an extra life, up to 3. A wrong weapon sends the
+    player back to choose a weapon and a key; the final riddle is asked until answered.
     """
-    chosen_weapon = select_weapon(weapons)
-    print(f"You chose the {chosen_weapon}.")
+    def __init__(self, io=None, rng=None):
+        """
+        :param io: Input/output strategy, the console when omitted.
+        :param rng: Random number generator (e.g. random.Random(seed)), the random module when omitted.
+        """
+        self.io = io or ConsoleIO()
+        self.rng = rng or random
+        self.state = START
+        self.lives = max_lives
+        self.chosen_weapon = None
+        self.steps = 0  # Riddles answered and weapons and keys chosen
+        self._handlers = {
+            START: self.start,
+            LEVEL_1: self.level_1,
+            CHOOSE_WEAPON: self.choose_weapon,
+            CHOOSE_KEY: self.choose_key,
+            LEVEL_2: self.level_2,
+            FINAL_RIDDLE: self.final_riddle,
+        }
+
+    def run(self):
+        """
+        Play until the game is won or lost.
+        :return: WON or LOST
+        """
+        while self.state not in (WON, LOST):
+            self.state = self._handlers[self.state]()
+        return self.state
+
+    def start(self):
+        self.io.show("Welcome to the Text-Based Adventure Game!")
+        self.io.show("You will solve riddles, choose weapons, and keys to progress.")
+        self.io.show("Your mission is to defeat the villain and complete the game!")
+        self.io.show("\nWelcome to Level 1!")
+        return LEVEL_1
+
+    def level_1(self):
+        if not check_lives(self.lives, self.io):
+            return LOST
+        self.io.show(f"\nYou have {self.lives} lives remaining.")
+        self.steps += 1
+        if ask_riddle(self.rng.choice(riddles), self.io):
+            self.io.show("Correct answer!")
+            return CHOOSE_WEAPON
+        self.io.show("Wrong answer! You lose a life.")
+        self.lives -= 1
+        return LEVEL_1
+
+    def choose_weapon(self):
+        self.steps += 1
+        self.chosen_weapon = select_weapon(weapons, self.io)
+        self.io.show(f"You chose the {self.chosen_weapon}.")
+        return CHOOSE_KEY
 
-    chosen_key = select_key(keys)
-    print(f"You chose the {chosen_key}.")
+    def choose_key(self):
+        self.steps += 1
+        chosen_key = select_key(keys, self.io, self.rng)
+        self.io.show(f"You chose the {chosen_key}.")
+        if not check_key(keys, chosen_key, self.rng):
+            self.io.show(f"The {chosen_key} did not open the door.")
+            return CHOOSE_KEY
+        self.io.show(f"The {chosen_key} opens the door!")
+        self.io.show("Congratulations, you've completed Level 1!")
+        return LEVEL_2
 
-    while not check_key(keys, chosen_key):
-        print(f"The {chosen_key} did not open the door.")
-        chosen_key = select_key(keys)
-        print(f"You chose the {chosen_key}.")
+    def level_2(self):
+        self.io.show("\nWelcome to Level 2!")
+        if self.lives < max_lives:
+            self.lives += 1
+            self.io.show(f"You've been granted an extra life! You now have {self.lives} lives.")
+        if not check_weapon(correct_weapon, self.chosen_weapon):
+            self.io.show("Wrong weapon! Choose the right weapon again and select the right key to defeat the villain.")
+            return CHOOSE_WEAPON
+        self.io.show(f"You defeated the villain with the {correct_weapon}!")
+        self.io.show("Final Riddle: ")
+        return FINAL_RIDDLE
 
-    print(f"The {chosen_key} opens the door!")
-    print("Congratulations, you've completed Level 1!")
-    level_2(lives, chosen_weapon)
+    def final_riddle(self):
+        self.steps += 1
+        if ask_riddle(self.rng.choice(riddles), self.io):
+            self.io.show("Congratulations! You've won the game!")
+            return WON
+        self.io.show("Wrong answer! Answer Again.")
+        return FINAL_RIDDLE
 
-def randomize_n_check_final_riddle():
+def play_random_games(count, seed, accuracy=None):
     """
-    Randomly select and check the final riddle for the player to win the game.
-    :return: True if the riddle is answered correctly, False otherwise.
+    Play games with the random policy. Runs in the worker processes of simulate_games.
+    :param count: Number of games
+    :param seed: Seed of the random number generator shared by the games and the policy
+    :param accuracy: Probability of answering a riddle correctly, a random known answer when None
+    :return: Tuple of (games won, Counter of the steps taken by the won games)
     """
-    riddle_data = random.choice(riddles)
-    if ask_riddle(riddle_data):
-        print("Congratulations! You've won the game!")
-        return True
-    else:
-        return False
+    rng = random.Random(seed)
+    policy = RandomPolicyIO(rng, accuracy)
+    wins, steps = 0, Counter()
+    for _ in range(count):
+        game = Game(policy, rng)
+        if game.run() == WON:
+            wins += 1
+            steps[game.steps] += 1
+    return wins, steps
 
-def level_1():
+def simulate_games(games, seed=0, accuracy=None, workers=0, chunk_size=10000):
     """
-    The first level of the game where the player solves riddles and chooses keys/weapons.
+    Play many games with the random policy, in chunks seeded from `seed` so the results
+    do not depend on the number of workers.
+    :param games: Number of games
+    :param seed: Seed of the simulation
+    :param accuracy: Probability of answering a riddle correctly, a random known answer when None
+    :param workers: Number of worker processes, 0 to play in this process
+    :param chunk_size: Games per chunk
+    :return: Dict with the games played and won, the win rate, the steps Counter of the won
+             games and the games per second
     """
-    lives = 3
-    print("\nWelcome to Level 1!")
+    started = time.perf_counter()
+    chunks = [
+        (min(chunk_size, games - start), f"{seed}:{index}", accuracy)
+        for index, start in enumerate(range(0, games, chunk_size))
+    ]
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(play_random_games, *zip(*chunks)))
+    else:
+        results = [play_random_games(*chunk) for chunk in chunks]
 
-    while check_lives(lives):
-        print(f"\nYou have {lives} lives remaining.")
-        riddle_data = random.choice(riddles)
-        if ask_riddle(riddle_data):
-            print("Correct answer!")
-            select_weapon_n_key(weapons, keys, lives)
-            break
-        else:
-            print("Wrong answer! You lose a life.")
-            lives -= 1
+    wins, steps = 0, Counter()
+    for chunk_wins, chunk_steps in results:
+        wins += chunk_wins
+        steps.update(chunk_steps)
+    seconds = time.perf_counter() - started
+    return {
+        "games": games,
+        "wins": wins,
+        "win_rate": wins / games if games else 0.0,
+        "steps": steps,
+        "seconds": seconds,
+        "games_per_second": games / seconds if seconds else 0.0,
+    }
 
-def level_2(lives, chosen_weapon):
+def steps_percentile(steps, fraction):
     """
-    The second level of the game where the player uses a weapon to defeat a villain.
-    :param lives: The number of lives the player has left.
-    :param chosen_weapon: The weapon chosen by the player.
+    :param steps: Counter of steps
+    :param fraction: Percentile as a fraction, e.g. 0.95
+    :return: Nearest-rank percentile of the steps, or 0 without games
     """
-    print("\nWelcome to Level 2!")
-
-    if lives < 3:
-        lives += 1
-        print(f"You've been granted an extra life! You now have {lives} lives.")
-
-    weapons = ["Sword", "Bow", "Magic Staff"]
-    correct_weapon = "Magic Staff"
+    rank = math.ceil(fraction * sum(steps.values()))
+    seen = 0
+    for value in sorted(steps):
+        seen += steps[value]
+        if seen >= rank:
+            return value
+    return 0
 
-    while not check_weapon(correct_weapon, chosen_weapon):
-        print("Wrong weapon! Choose the right weapon again and select the right key to defeat the villain.")
-        select_weapon_n_key(weapons, keys, lives)
-
-    print(f"You defeated the villain with the {correct_weapon}!")
-    print("Final Riddle: ")
-    riddle_data = random.choice(riddles)
-    if ask_riddle(riddle_data):
-        print("Congratulations! You've won the game!")
-    else:
-        print("Wrong answer! Answer Again.")
-        while not randomize_n_check_final_riddle():
-            print("Wrong answer! Answer Again.")
+def display_simulation(results):
+    """
+    Display the win rate and the distribution of the steps to complete of a simulation.
+    :param results: Results of simulate_games
+    """
+    steps = results["steps"]
+    print(f"Games: {results['games']} in {results['seconds']:.2f}s ({results['games_per_second']:,.0f} games/sec)")
+    print(f"Wins: {results['wins']} ({results['win_rate']:.2%})")
+    if not steps:
+        return
+    mean = sum(value * count for value, count in steps.items()) / results["wins"]
+    print(f"Steps to complete: min {min(steps)}, mean {mean:.2f}, p50 {steps_percentile(steps, 0.5)}, "
+          f"p90 {steps_percentile(steps, 0.9)}, p99 {steps_percentile(steps, 0.99)}, max {max(steps)}")
+    print(f"{'Steps':<12}{'Games':>12}{'Share':>10}")
+    low, p99 = min(steps), steps_percentile(steps, 0.99)
+    width = max(1, math.ceil((p99 - low + 1) / 20))
+    end = low
+    while end <= p99:
+        count = sum(steps[value] for value in range(end, end + width))
+        label = str(end) if width == 1 else f"{end}-{end + width - 1}"
+        print(f"{label:<12}{count:>12}{count / results['wins']:>10.2%}")
+        end += width
+    tail = sum(count for value, count in steps.items() if value >= end)
+    if tail:
+        print(f"{f'{end}+':<12}{tail:>12}{tail / results['wins']:>10.2%}")
 
-def start_game():
+def start_game(io=None, rng=None):
     """
     The main function to start the game and introduce the player to the gameplay.
+    :param io: Input/output strategy, the console when omitted.
+    :param rng: Random number generator, the random module when omitted.
+    :return: WON or LOST
+    """
+    return Game(io, rng).run()
+
+def main(argv=None):
+    """
+    Play the game interactively, or simulate games with --simulate N.
+    :param argv: Command line arguments, sys.argv when omitted
     """
-    print("Welcome to the Text-Based Adventure Game!")
-    print("You will solve riddles, choose weapons, and keys to progress.")
-    print("Your mission is to defeat the villain and complete the game!")
+    parser = argparse.ArgumentParser(description="Text-Based Adventure Game")
+    parser.add_argument("--seed", type=int, help="Seed of the random number generator")
+    parser.add_argument("--simulate", type=int, metavar="N", help="Play N games with a random policy and report the results")
+    parser.add_argument("--accuracy", type=float,
+                        help="Probability the simulated player answers a riddle correctly, a random known answer by default")
+    parser.add_argument("--workers", type=int, default=0, metavar="N",
+                        help="Worker processes playing the simulated games, 0 to play in this process")
+    args = parser.parse_args(argv)
 
-    level_1()
+    if args.simulate:
+        if args.workers < 0 or (args.accuracy is not None and not 0 <= args.accuracy <= 1):
+            parser.error("--workers must not be negative and --accuracy must be between 0 and 1.")
+        display_simulation(simulate_games(args.simulate, args.seed or 0, args.accuracy, args.workers))
+        return
+    start_game(rng=random.Random(args.seed) if args.seed is not None else None)
 
 
 if __name__ == "__main__":
-    start_game()
+    main()
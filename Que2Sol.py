@@ -1,37 +1,185 @@
-def calculate_total_income_tax(income):
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from bisect import bisect_left
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Slab tables of every regime and financial year. Adding a regime or a year only needs
+# an entry in this file (JSON, or TOML with the same layout).
+TAX_SCHEDULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tax_schedules.json")
+
+def _format_lakh(amount):
+    return f"{amount / 100000:g}"
+
+class TaxSchedule:
     """
-    Calculate the total income tax based on the defined tax slabs.
-    :param income: The total taxable income
-    :return: The total tax amount and the breakdown of the tax by slab
+    Compiled slab table of one regime and financial year. The tax owed at the lower bound
+    of every slab is precomputed, so the tax of an income is a bisect over the bounds plus
+    one multiply, whatever the number of slabs.
     """
-    tax = 0
-    slab_details = []
+    def __init__(self, regime, year, slabs):
+        """
+        :param regime: Name of the tax regime
+        :param year: Financial year, e.g. "2024-25"
+        :param slabs: List of (upper bound or None for the last slab, rate in percent), in order
+        """
+        self.regime = regime
+        self.year = year
+        self.lowers = []
+        self.uppers = []
+        self.rates = []
+        self.labels = []
+        self.rate_labels = []
+        lower = 0
+        for upper, rate in slabs:
+            if upper is not None and upper <= lower:
+                raise ValueError(f"Slab bounds of {regime} {year} must increase.")
+            self.lowers.append(lower)
+            self.uppers.append(upper)
+            self.rates.append(rate / 100)
+            self.labels.append(
+                f"{_format_lakh(lower)} - {_format_lakh(upper)} lac" if upper is not None
+                else f"Above {_format_lakh(lower)} lac"
+            )
+            self.rate_labels.append(f"{rate:g}%" if rate else "Nil")
+            if upper is None:
+                break
+            lower = upper
+        if self.uppers[-1] is not None:
+            raise ValueError(f"The last slab of {regime} {year} must have no upper bound.")
 
-    # First slab: Up to ₹2,50,000 -> Nil
-    if income <= 250000:
-        slab_details.append(("0 - 2.5 lac", income, "Nil", "Nil"))
-    else:
-        slab_details.append(("0 - 2.5 lac", 250000, "Nil", "Nil"))
+        # Tax owed on an income equal to each lower bound, added slab by slab like the
+        # breakdown does, so both give exactly the same totals.
+        self.cumulative = [0]
+        for index in range(len(self.lowers) - 1):
+            self.cumulative.append(self.cumulative[-1] + (self.uppers[index] - self.lowers[index]) * self.rates[index])
 
-    # Second slab: ₹2,50,000 – ₹5,00,000 -> 5%
-    if income > 250000:
-        taxable_amount = min(income - 250000, 250000)  # Max ₹2,50,000 in this slab
-        tax += taxable_amount * 0.05
-        slab_details.append(("2.5 - 5 lac", taxable_amount, "5%", taxable_amount * 0.05))
+    def slab_index(self, income):
+        """
+        :param income: The total taxable income
+        :return: Index of the slab the income ends in
+        """
+        # An income equal to a bound belongs to the slab below it.
+        return max(bisect_left(self.lowers, income) - 1, 0)
 
-    # Third slab: ₹5,00,000 – ₹10,00,000 -> 20%
-    if income > 500000:
-        taxable_amount = min(income - 500000, 500000)  # Max ₹5,00,000 in this slab
-        tax += taxable_amount * 0.20
-        slab_details.append(("5 - 10 lac", taxable_amount, "20%", taxable_amount * 0.20))
+    def tax(self, income):
+        """
+        :param income: The total taxable income
+        :return: The total tax amount
+        """
+        index = self.slab_index(income)
+        return self.cumulative[index] + (income - self.lowers[index]) * self.rates[index]
 
-    # Fourth slab: Above ₹10,00,000 -> 30%
-    if income > 1000000:
-        taxable_amount = income - 1000000  # Amount above ₹10,00,000
-        tax += taxable_amount * 0.30
-        slab_details.append(("Above 10 lac", taxable_amount, "30%", taxable_amount * 0.30))
+    def breakdown(self, income):
+        """
+        :param income: The total taxable income
+        :return: List of (slab label, amount to tax, rate label, tax amount) for the slabs the income reaches
+        """
+        slab_details = []
+        for index in range(self.slab_index(income) + 1):
+            upper = self.uppers[index]
+            amount = income - self.lowers[index]
+            if upper is not None and income > upper:
+                amount = upper - self.lowers[index]
+            tax = amount * self.rates[index] if self.rates[index] else "Nil"
+            slab_details.append((self.labels[index], amount, self.rate_labels[index], tax))
+        return slab_details
 
-    return tax, slab_details
+@lru_cache(maxsize=None)
+def load_tax_config(path=TAX_SCHEDULES_PATH):
+    """
+    Read a tax schedule file, once per path.
+    :param path: Path of a .json or .toml schedule file
+    :return: The parsed configuration
+    """
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as config_file:
+            return tomllib.load(config_file)
+    with open(path, encoding="utf-8") as config_file:
+        return json.load(config_file)
+
+@lru_cache(maxsize=None)
+def get_tax_schedule(regime=None, year=None, path=TAX_SCHEDULES_PATH):
+    """
+    Return the compiled schedule of a regime and financial year, compiling it once.
+    :param regime: Name of the tax regime, the file's default when omitted
+    :param year: Financial year, the file's default when omitted
+    :param path: Path of the schedule file
+    :return: TaxSchedule
+    """
+    config = load_tax_config(path)
+    regime = regime or config["default"]["regime"]
+    year = year or config["default"]["year"]
+    try:
+        slabs = config["regimes"][regime][year]
+    except KeyError:
+        raise ValueError(f"No tax schedule for regime {regime!r} and year {year!r}.") from None
+    return TaxSchedule(regime, year, [(slab.get("up_to"), slab["rate"]) for slab in slabs])
+
+def calculate_total_income_tax(income, schedule=None):
+    """
+    Calculate the total income tax based on the defined tax slabs.
+    :param income: The total taxable income
+    :param schedule: TaxSchedule to apply, the default regime and year when omitted
+    :return: The total tax amount and the breakdown of the tax by slab
+    """
+    schedule = schedule or get_tax_schedule()
+    return schedule.tax(income), schedule.breakdown(income)
+
+def calculate_income_tax_batch(incomes, schedule=None):
+    """
+    Calculate the income tax of many incomes in one pass. With NumPy installed the slabs are
+    applied to the whole array at once (clip against the slab boundaries); otherwise the
+    same arithmetic runs income by income. Totals use the schedule's cumulative taxes, so
+    they are exactly equal to calculate_total_income_tax.
+    :param incomes: NumPy array, buffer (e.g. array('d')) or sequence of incomes
+    :param schedule: TaxSchedule to apply, the default regime and year when omitted
+    :return: Tuple of (total tax per income, taxable amount per income and slab,
+             tax per income and slab), as NumPy arrays or as lists without NumPy
+    """
+    schedule = schedule or get_tax_schedule()
+    if np is None:
+        slabs = [
+            (lower, float("inf") if upper is None else upper - lower, rate)
+            for lower, upper, rate in zip(schedule.lowers, schedule.uppers, schedule.rates)
+        ]
+        totals, amounts, taxes = [], [], []
+        for income in incomes:
+            income_amounts, income_taxes = [], []
+            for lower, width, rate in slabs:
+                amount = income - lower
+                amount = 0 if amount <= 0 else width if amount > width else amount
+                income_amounts.append(amount)
+                income_taxes.append(amount * rate)
+            totals.append(schedule.tax(income))
+            amounts.append(income_amounts)
+            taxes.append(income_taxes)
+        return totals, amounts, taxes
+
+    incomes = np.asarray(incomes, dtype=np.float64)
+    lowers = np.array(schedule.lowers, dtype=np.float64)
+    widths = np.array([np.inf if upper is None else upper - lower for lower, upper in zip(schedule.lowers, schedule.uppers)])
+    rates = np.array(schedule.rates)
+    amounts = np.clip(incomes[:, None] - lowers, 0, widths)
+    taxes = amounts * rates
+    index = np.maximum(np.searchsorted(lowers, incomes, side="left") - 1, 0)
+    totals = np.array(schedule.cumulative, dtype=np.float64)[index] + (incomes - lowers[index]) * rates[index]
+    return totals, amounts, taxes
 
 def display_tax_breakdown(income, slab_details, total_tax):
     """
@@ -64,14 +212,262 @@ def get_user_income():
         except ValueError as ve:
             print(f"Invalid input: {ve}. Please enter a valid non-negative number.")
 
-def start_income_tax_calculator():
+def start_income_tax_calculator(schedule=None):
     """
     The main function that drives the income tax calculator application.
+    :param schedule: TaxSchedule to apply, the default regime and year when omitted
     """
     print("Welcome to the Income Tax Calculator!")
     income = get_user_income()
-    total_tax, slab_details = calculate_total_income_tax(income)
+    total_tax, slab_details = calculate_total_income_tax(income, schedule)
     display_tax_breakdown(income, slab_details, total_tax)
 
+def benchmark_income_tax(count, seed=0, schedule=None):
+    """
+    Time the scalar calculation with its breakdown, the schedule lookup alone and the batch
+    calculation over the same random incomes, and check that they agree exactly.
+    :param count: Number of incomes
+    :param seed: Seed of the random incomes
+    :param schedule: TaxSchedule to apply, the default regime and year when omitted
+    :return: Dict with the incomes per second of each path and the number of mismatches
+    """
+    schedule = schedule or get_tax_schedule()
+    rng = random.Random(seed)
+    incomes = [round(rng.uniform(0, 3000000), 2) for _ in range(count)]
+    batch_incomes = np.array(incomes) if np is not None else incomes
+
+    started = time.perf_counter()
+    scalar_totals = [calculate_total_income_tax(income, schedule)[0] for income in incomes]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    lookup_totals = [schedule.tax(income) for income in incomes]
+    lookup_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch_totals, _, _ = calculate_income_tax_batch(batch_incomes, schedule)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for scalar, lookup, batch in zip(scalar_totals, lookup_totals, batch_totals)
+        if not scalar == lookup == batch
+    )
+    return {
+        "incomes": count,
+        "numpy": np is not None,
+        "scalar_per_second": count / scalar_seconds,
+        "lookup_per_second": count / lookup_seconds,
+        "batch_per_second": count / batch_seconds,
+        "mismatches": mismatches,
+    }
+
+def _read_chunks(lines, chunk_size):
+    """
+    Split the input lines into lists of at most chunk_size lines.
+    :param lines: Iterable of input lines
+    :param chunk_size: Lines per chunk
+    :return: Generator of (number of the first line, lines)
+    """
+    line_number = 1
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield line_number, chunk
+        line_number += len(chunk)
+
+def output_header(schedule, output_format):
+    """
+    :param schedule: TaxSchedule the results are computed with
+    :param output_format: "csv" or "ndjson"
+    :return: Text to write before the results
+    """
+    if output_format != "csv":
+        return ""
+    header = ["income", "total_tax"]
+    for label in schedule.labels:
+        header += [f"{label} amount", f"{label} tax"]
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(header)
+    return buffer.getvalue()
+
+def compute_chunk(first_line, lines, schedule_key, output_format, column=None):
+    """
+    Compute and format the tax of one chunk of input lines. Runs in the worker processes.
+    :param first_line: Line number of the first line, for the error messages
+    :param lines: Input lines, one income per line or CSV rows
+    :param schedule_key: (regime, year, path) of the schedule
+    :param output_format: "csv" or "ndjson"
+    :param column: Index of the income in CSV rows, 0 when omitted
+    :return: Tuple of (formatted results, number of results, list of error messages)
+    """
+    schedule = get_tax_schedule(*schedule_key)
+    incomes, errors = [], []
+    for offset, row in enumerate(csv.reader(lines)):
+        if not row:
+            continue
+        value = row[column or 0] if len(row) > (column or 0) else ""
+        try:
+            income = float(value)
+            if not (math.isfinite(income) and income >= 0):
+                raise ValueError
+        except ValueError:
+            errors.append(f"Line {first_line + offset}: invalid income {value!r}")
+            continue
+        incomes.append(income)
+    if not incomes:
+        return "", 0, errors
+
+    totals, amounts, taxes = calculate_income_tax_batch(incomes, schedule)
+    if np is not None:
+        totals, amounts, taxes = totals.tolist(), amounts.tolist(), taxes.tolist()
+    buffer = io.StringIO()
+    if output_format == "csv":
+        writer = csv.writer(buffer)
+        for income, total, income_amounts, income_taxes in zip(incomes, totals, amounts, taxes):
+            row = [income, total]
+            for amount, tax in zip(income_amounts, income_taxes):
+                row += [amount, tax]
+            writer.writerow(row)
+    else:
+        labels = schedule.labels
+        for income, total, income_amounts, income_taxes in zip(incomes, totals, amounts, taxes):
+            buffer.write(json.dumps({
+                "income": income,
+                "total_tax": total,
+                "slabs": [
+                    {"slab": label, "amount": amount, "tax": tax}
+                    for label, amount, tax in zip(labels, income_amounts, income_taxes)
+                ],
+            }))
+            buffer.write("\n")
+    return buffer.getvalue(), len(incomes), errors
+
+def stream_income_tax(input_file, output_file, schedule_key, output_format="csv", column=None,
+                      chunk_size=10000, workers=0, error_file=None):
+    """
+    Compute the tax of every income of a file, a chunk at a time, and write the results with
+    their slab breakdown. Only a bounded number of chunks is in flight, so memory stays
+    constant whatever the size of the input.
+    :param input_file: Text file of incomes, one per line, or CSV rows
+    :param output_file: Text file the CSV or NDJSON results are written to
+    :param schedule_key: (regime, year, path) of the schedule
+    :param output_format: "csv" or "ndjson"
+    :param column: Name of the income column when the input is CSV with a header row
+    :param chunk_size: Lines per chunk
+    :param workers: Number of worker processes, 0 to compute in this process
+    :param error_file: Text file the invalid lines are reported to, stderr when omitted
+    :return: Dict with the number of rows written, invalid lines, seconds and rows per second
+    """
+    error_file = error_file or sys.stderr
+    schedule = get_tax_schedule(*schedule_key)
+    started = time.perf_counter()
+    lines = iter(input_file)
+    column_index = None
+    first_line = 1
+    if column is not None:
+        header = next(csv.reader([next(lines, "")]), [])
+        if column not in header:
+            raise ValueError(f"Column {column!r} is not in the input header.")
+        column_index = header.index(column)
+        first_line = 2
+
+    rows = invalid = 0
+
+    def write(result):
+        nonlocal rows, invalid
+        text, count, errors = result
+        output_file.write(text)
+        rows += count
+        invalid += len(errors)
+        for error in errors:
+            print(error, file=error_file)
+
+    output_file.write(output_header(schedule, output_format))
+    chunks = (
+        (line_number + first_line - 1, chunk, schedule_key, output_format, column_index)
+        for line_number, chunk in _read_chunks(lines, chunk_size)
+    )
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().result())
+                pending.append(executor.submit(compute_chunk, *chunk))
+            while pending:
+                write(pending.popleft().result())
+    else:
+        for chunk in chunks:
+            write(compute_chunk(*chunk))
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "invalid": invalid,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
+
+def main(argv=None):
+    """
+    Run the interactive calculator, the bulk mode with --input, or the benchmark with --benchmark N.
+    :param argv: Command line arguments, sys.argv when omitted
+    """
+    parser = argparse.ArgumentParser(description="Income Tax Calculator")
+    parser.add_argument("--regime", help="Tax regime, the schedule file's default when omitted")
+    parser.add_argument("--year", help="Financial year, e.g. 2024-25, the schedule file's default when omitted")
+    parser.add_argument("--schedules", default=TAX_SCHEDULES_PATH, metavar="PATH",
+                        help="JSON or TOML file of tax schedules")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="Compare the scalar and batch calculations over N random incomes")
+    parser.add_argument("--input", metavar="PATH",
+                        help="Compute the tax of every income in this file (- for stdin), one per line or CSV")
+    parser.add_argument("--output", default="-", metavar="PATH", help="File the results are written to, stdout by default")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv", help="Format of the results")
+    parser.add_argument("--column", help="Name of the income column when the input is CSV with a header row")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Incomes per chunk")
+    parser.add_argument("--workers", type=int, default=0, metavar="N",
+                        help="Worker processes computing the chunks, 0 to compute in this process")
+    args = parser.parse_args(argv)
+
+    try:
+        schedule = get_tax_schedule(args.regime, args.year, args.schedules)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    if args.benchmark:
+        results = benchmark_income_tax(args.benchmark, schedule=schedule)
+        print(f"Incomes: {results['incomes']} ({schedule.regime} regime {schedule.year}, "
+              f"batch path {'NumPy' if results['numpy'] else 'pure Python'})")
+        print(f"Scalar: {results['scalar_per_second']:,.0f} incomes/sec")
+        print(f"Lookup: {results['lookup_per_second']:,.0f} incomes/sec")
+        print(f"Batch:  {results['batch_per_second']:,.0f} incomes/sec")
+        print(f"Mismatches: {results['mismatches']}")
+        return
+    if args.input:
+        if args.chunk_size < 1 or args.workers < 0:
+            parser.error("--chunk-size must be positive and --workers not negative.")
+        input_file = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+        output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+        try:
+            results = stream_income_tax(
+                input_file, output_file, (schedule.regime, schedule.year, args.schedules), args.format,
+                args.column, args.chunk_size, args.workers,
+            )
+        except ValueError as error:
+            parser.error(str(error))
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+        print(f"{results['rows']} incomes in {results['seconds']:.2f}s ({results['rows_per_second']:,.0f} rows/sec), "
+              f"{results['invalid']} invalid lines", file=sys.stderr)
+        if results["invalid"]:
+            sys.exit(1)
+        return
+    start_income_tax_calculator(schedule)
+
 if __name__ == "__main__":
-    start_income_tax_calculator()
+    main()
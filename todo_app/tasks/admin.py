@@ -1,6 +1,9 @@
 from django.contrib import admin
-from  .models import UserProfile, Task
+from  .models import UserProfile, Task, ArchivedTask, TaskTombstone, Job
 # Register your models here.
 
 admin.site.register(UserProfile)
-admin.site.register(Task)
\ No newline at end of file
+admin.site.register(Task)
+admin.site.register(ArchivedTask)
+admin.site.register(TaskTombstone)
+admin.site.register(Job)
\ No newline at end of file
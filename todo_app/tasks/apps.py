@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401
+        from .metrics import install_query_recorder
+        from .search import install_search_index
+        connection_created.connect(install_query_recorder)
+        post_migrate.connect(install_search_index, sender=self)
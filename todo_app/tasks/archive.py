@@ -0,0 +1,111 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ArchivedTask, Task, TaskTombstone
+from .pagination import InvalidQuery
+from .versioning import bump_task_versions
+
+DEFAULT_ARCHIVE = {
+    'AFTER_DAYS': 90,
+    'BATCH_SIZE': 1000,
+}
+
+FINISHED = 'finished'
+ARCHIVE_COLUMNS = ('id', 'title', 'description', 'status', 'employer_id', 'employee_id', 'created_at', 'updated_at')
+
+
+def archive_settings():
+    """
+    Read the TASKS_ARCHIVE setting merged over the defaults.
+    :return: Dict of archive settings
+    """
+    return {**DEFAULT_ARCHIVE, **getattr(settings, 'TASKS_ARCHIVE', {})}
+
+
+def archive_cutoff(after_days=None):
+    """
+    :param after_days: Days a task must have been finished, TASKS_ARCHIVE['AFTER_DAYS'] when omitted
+    :return: Tasks finished before this time are archived
+    """
+    if after_days is None:
+        after_days = archive_settings()['AFTER_DAYS']
+    return timezone.now() - timedelta(days=after_days)
+
+
+def archivable_tasks(cutoff):
+    """
+    :param cutoff: Tasks last updated before this time are archivable
+    :return: Queryset of the finished tasks to archive, oldest first (task_finished_idx)
+    """
+    return Task.objects.filter(status=FINISHED, updated_at__lt=cutoff).order_by('updated_at', 'id')
+
+
+def archive_batch(task_ids, cutoff):
+    """
+    Move one batch of tasks into the archive in a short transaction. Rows changed or
+    locked by a request since they were selected are left for a later run.
+    :param task_ids: IDs of archivable tasks
+    :param cutoff: Cutoff the tasks were selected with
+    :return: Number of tasks archived
+    """
+    using = router.db_for_write(Task)
+    with transaction.atomic(using=using):
+        rows = list(
+            Task.objects.using(using).select_for_update(skip_locked=True)
+            .filter(id__in=task_ids, status=FINISHED, updated_at__lt=cutoff)
+            .values_list(*ARCHIVE_COLUMNS)
+        )
+        if not rows:
+            return 0
+        ArchivedTask.objects.using(using).bulk_create(ArchivedTask(**dict(zip(ARCHIVE_COLUMNS, row))) for row in rows)
+        # Deleted without the per row delete signals, which would publish task.deleted
+        # events for tasks that keep existing. They still leave the changes feed, which
+        # only reads the task table, so they get tombstones like deleted tasks: a client
+        # syncing incrementally drops them just like one doing a full sync.
+        Task.delete_rows([row[0] for row in rows], using)
+        TaskTombstone.objects.using(using).bulk_create(
+            TaskTombstone(task_id=row[0], employer_id=row[4], employee_id=row[5]) for row in rows
+        )
+        bump_task_versions([row[4] for row in rows], [row[5] for row in rows])
+    return len(rows)
+
+
+def archive_tasks(cutoff, batch_size=None, progress=None):
+    """
+    Move every finished task last updated before the cutoff into the archive, one batch
+    per transaction so no lock is held for long.
+    :param cutoff: Tasks last updated before this time are archived
+    :param batch_size: Tasks per batch, TASKS_ARCHIVE['BATCH_SIZE'] when omitted
+    :param progress: Optional function called with the running total after each batch
+    :return: Number of tasks archived
+    """
+    batch_size = batch_size or archive_settings()['BATCH_SIZE']
+    archived, last = 0, None
+    while True:
+        tasks = archivable_tasks(cutoff)
+        if last is not None:
+            # Rows skipped because they were locked must not be selected again and again.
+            tasks = tasks.filter(Q(updated_at__gt=last[0]) | Q(updated_at=last[0], id__gt=last[1]))
+        batch = list(tasks.values_list('updated_at', 'id')[:batch_size])
+        if not batch:
+            return archived
+        archived += archive_batch([task_id for _, task_id in batch], cutoff)
+        last = batch[-1]
+        if progress is not None:
+            progress(archived)
+
+
+def task_model(params):
+    """
+    Pick the table a task list reads from.
+    :param params: Query string parameters: archived=1 reads the archive
+    :return: Task or ArchivedTask
+    """
+    archived = params.get('archived', '')
+    if archived in ('', '0', 'false'):
+        return Task
+    if archived in ('1', 'true'):
+        return ArchivedTask
+    raise InvalidQuery('Invalid archived, expected 1 or 0.')
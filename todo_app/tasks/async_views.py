@@ -0,0 +1,180 @@
+import asyncio
+import inspect
+import json
+from functools import wraps
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from .archive import task_model
+from .authentication import CachedTokenAuthentication, aauthenticate_token
+from .events import events_settings, get_broker
+from .metrics import serializer_timer
+from .models import Task
+from .pagination import InvalidQuery
+from .permission import IsEmployer, IsEmployee
+from .renderers import FastJSONRenderer
+from .rows import atask_page_rows, build_rows
+from .throttling import request_wait, retry_after
+
+
+async def _has_permission(permission, request):
+    """
+    Run a permission check that may be either sync or async.
+    :param permission: Permission instance
+    :param request: Django HttpRequest with the authenticated user set
+    :return: True if the permission is granted
+    """
+    granted = permission.has_permission(request, None)
+    if inspect.isawaitable(granted):
+        granted = await granted
+    return granted
+
+
+def async_api_view(methods, permission_classes):
+    """
+    Serve an async view through token authentication, the given permission classes and
+    the tenant throttle, answering with the same status codes and error bodies as the DRF views.
+    :param methods: Allowed HTTP methods
+    :param permission_classes: Permission classes checked in order
+    :return: View decorator
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                auth = await aauthenticate_token(request)
+            except exceptions.AuthenticationFailed as e:
+                return _unauthorized(request, e.detail)
+            if auth is None:
+                return _unauthorized(request, exceptions.NotAuthenticated.default_detail)
+            request.user, request.auth = auth
+            for permission_class in permission_classes:
+                if not await _has_permission(permission_class(), request):
+                    return JsonResponse({'detail': exceptions.PermissionDenied.default_detail}, status=status.HTTP_403_FORBIDDEN)
+            wait = request_wait(request)
+            if wait:
+                response = JsonResponse({'detail': exceptions.Throttled(wait).detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+                response['Retry-After'] = retry_after(wait)
+                return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _unauthorized(request, detail):
+    response = JsonResponse({'detail': str(detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    response['WWW-Authenticate'] = CachedTokenAuthentication().authenticate_header(request)
+    return response
+
+
+async def _task_page_response(request, **owner):
+    """
+    Serialize one keyset page of the requesting user's tasks, or of their archived tasks with archived=1.
+    :param request: User Request Object
+    :param owner: Lookup scoping the tasks to the requesting user
+    :return: Response Json Object
+    """
+    try:
+        tasks = task_model(request.GET).objects.filter(**owner)
+        fields, page, next_cursor = await atask_page_rows(tasks, request.GET)
+    except InvalidQuery as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    with serializer_timer():
+        results = build_rows(fields, page)
+    # Large pages go through the same encoder as the sync views.
+    body = FastJSONRenderer().render({'next_cursor': next_cursor, 'results': results})
+    return HttpResponse(body, content_type='application/json')
+
+
+@async_api_view(['GET'], [IsEmployer])
+async def view_tasks(request):
+    """
+    Async version of views.view_tasks.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    return await _task_page_response(request, employer_id=request.user.id)
+
+
+@async_api_view(['GET'], [IsEmployee])
+async def view_employee_tasks(request):
+    """
+    Async version of views.view_employee_tasks.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    return await _task_page_response(request, employee_id=request.user.id)
+
+
+@async_api_view(['PATCH'], [IsEmployee])
+async def update_task_status(request, task_id):
+    """
+    Async version of views.update_task_status.
+    :param request: User Request Object
+    :param task_id: Task ID
+    :return: Response Json Object
+    """
+    try:
+        task = await Task.objects.aget(id=task_id, employee_id=request.user.id)
+    except Task.DoesNotExist:
+        return JsonResponse({'detail': 'No Task matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error.'}, status=status.HTTP_400_BAD_REQUEST)
+    if isinstance(data, dict) and 'status' in data:
+        task.status = data['status']
+        await task.asave()
+        return JsonResponse({'status': 'Task status updated'})
+    return JsonResponse({'error': 'Invalid data'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+async def _event_stream(broker, subscription, missed, channel):
+    """
+    Yield the missed events, then live events as they are published, with keepalive
+    comments in between so proxies keep the connection open.
+    """
+    config = events_settings()
+    try:
+        yield f'retry: {config["RETRY"]}\n\n'
+        if missed is None:
+            yield broker.reset_event(channel).encode()
+        else:
+            for event in missed:
+                yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), config['KEEPALIVE'])
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                # Too far behind; the client reconnects and resumes from its last event ID.
+                break
+            yield event.encode()
+    finally:
+        subscription.close()
+
+
+@async_api_view(['GET'], [IsEmployer])
+async def task_events(request):
+    """
+    Allow an Employer to follow the creation, updates, status changes and deletion of
+    their tasks as Server-Sent Events. A reconnecting client resumes after the
+    Last-Event-ID header (or the last_event_id query parameter).
+    :param request: User Request Object
+    :return: Streaming text/event-stream Response
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    broker = get_broker()
+    subscription, missed = broker.subscribe(request.user.id, last_event_id)
+    response = StreamingHttpResponse(
+        _event_stream(broker, subscription, missed, request.user.id), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Ask nginx not to buffer the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,283 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from .models import UserProfile
+
+# Fields of the lightweight principal, in the order they are stored in the cache.
+PRINCIPAL_FIELDS = ('id', 'phone_number', 'role', 'employer_id', 'is_active')
+
+DEFAULT_AUTH_CACHE = {
+    'TIMEOUT': 300,
+    # Invalidation only reaches this process and the shared cache, so the other workers
+    # keep accepting a revoked token for up to this many seconds; None uses TIMEOUT.
+    'LOCAL_TIMEOUT': 5,
+    'MAX_SIZE': 10000,
+    'SHARED_CACHE': None,
+}
+
+
+class TTLCache:
+    """
+    Thread safe in-process LRU cache whose entries expire after a fixed time to live.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _auth_cache_settings():
+    """
+    Read the TASKS_AUTH_CACHE setting merged over the defaults.
+    :return: Dict of cache settings
+    """
+    return {**DEFAULT_AUTH_CACHE, **getattr(settings, 'TASKS_AUTH_CACHE', {})}
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+    """
+    Return the process wide token cache, creating it on first use.
+    :return: TTLCache instance
+    """
+    global _local_cache
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                config = _auth_cache_settings()
+                ttl = config['LOCAL_TIMEOUT'] if config['LOCAL_TIMEOUT'] is not None else config['TIMEOUT']
+                _local_cache = TTLCache(config['MAX_SIZE'], ttl)
+    return _local_cache
+
+
+def get_shared_cache():
+    """
+    Return the shared Django cache configured in TASKS_AUTH_CACHE['SHARED_CACHE'], if any.
+    :return: Django cache or None
+    """
+    alias = _auth_cache_settings()['SHARED_CACHE']
+    return caches[alias] if alias else None
+
+
+def _shared_key(key):
+    return f'tasks:auth:{key}'
+
+
+def build_principal(values):
+    """
+    Build a UserProfile carrying only the principal fields, without a database query.
+    Every other field is deferred and is loaded lazily if a view ever reads it.
+    :param values: Tuple of values in PRINCIPAL_FIELDS order
+    :return: UserProfile instance
+    """
+    fields = dict(zip(PRINCIPAL_FIELDS, values))
+    # from_db expects the loaded values in the model's concrete field order.
+    field_names = [field.attname for field in UserProfile._meta.concrete_fields if field.attname in fields]
+    return UserProfile.from_db(DEFAULT_DB_ALIAS, field_names, [fields[name] for name in field_names])
+
+
+def fetch_principal_values(key):
+    """
+    Load the principal fields of the owner of a token.
+    :param key: Token key
+    :return: Tuple of values in PRINCIPAL_FIELDS order, or None if the token does not exist
+    """
+    return Token.objects.filter(key=key).values_list(*(f'user__{field}' for field in PRINCIPAL_FIELDS)).first()
+
+
+async def afetch_principal_values(key):
+    """
+    Async version of fetch_principal_values.
+    :param key: Token key
+    :return: Tuple of values in PRINCIPAL_FIELDS order, or None if the token does not exist
+    """
+    return await Token.objects.filter(key=key).values_list(*(f'user__{field}' for field in PRINCIPAL_FIELDS)).afirst()
+
+
+def get_cached_principal_values(key):
+    """
+    Look up a token in the in-process cache, then in the shared cache.
+    :param key: Token key
+    :return: Tuple of values in PRINCIPAL_FIELDS order, or None on a miss
+    """
+    local = get_local_cache()
+    values = local.get(key)
+    if values is None:
+        shared = get_shared_cache()
+        if shared is not None:
+            values = shared.get(_shared_key(key))
+            if values is not None:
+                values = tuple(values)
+                local.set(key, values)
+    return values
+
+
+async def aget_cached_principal_values(key):
+    """
+    Async version of get_cached_principal_values.
+    :param key: Token key
+    :return: Tuple of values in PRINCIPAL_FIELDS order, or None on a miss
+    """
+    local = get_local_cache()
+    values = local.get(key)
+    if values is None:
+        shared = get_shared_cache()
+        if shared is not None:
+            values = await shared.aget(_shared_key(key))
+            if values is not None:
+                values = tuple(values)
+                local.set(key, values)
+    return values
+
+
+def cache_principal_values(key, values):
+    """
+    Store the principal of a token in the in-process cache and the shared cache.
+    :param key: Token key
+    :param values: Tuple of values in PRINCIPAL_FIELDS order
+    """
+    get_local_cache().set(key, values)
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.set(_shared_key(key), values, _auth_cache_settings()['TIMEOUT'])
+
+
+async def acache_principal_values(key, values):
+    """
+    Async version of cache_principal_values.
+    :param key: Token key
+    :param values: Tuple of values in PRINCIPAL_FIELDS order
+    """
+    get_local_cache().set(key, values)
+    shared = get_shared_cache()
+    if shared is not None:
+        await shared.aset(_shared_key(key), values, _auth_cache_settings()['TIMEOUT'])
+
+
+def invalidate_token(key):
+    """
+    Drop a token from every cache level.
+    :param key: Token key
+    """
+    get_local_cache().delete(key)
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.delete(_shared_key(key))
+
+
+def invalidate_tokens(keys, using=DEFAULT_DB_ALIAS):
+    """
+    Drop tokens from every cache level now and again once the current transaction commits:
+    a request running before the commit still reads the old rows and may cache them again.
+    :param keys: Token keys
+    :param using: Database alias of the transaction
+    """
+    keys = list(keys)
+
+    def drop():
+        for key in keys:
+            invalidate_token(key)
+
+    drop()
+    transaction.on_commit(drop, using=using)
+
+
+def invalidate_user(user_id, using=DEFAULT_DB_ALIAS):
+    """
+    Drop the tokens of a user from every cache level, now and after the commit.
+    The keys are read now, since the tokens of a deleted user are gone by then.
+    :param user_id: UserProfile ID
+    :param using: Database alias of the transaction
+    """
+    invalidate_tokens(Token.objects.using(using).filter(user_id=user_id).values_list('key', flat=True), using)
+
+
+def principal_for_token(values, key):
+    """
+    Turn cached principal values into the (user, token) pair DRF expects.
+    :param values: Tuple of values in PRINCIPAL_FIELDS order
+    :param key: Token key
+    :return: Tuple of (user, token)
+    """
+    user = build_principal(values)
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return user, Token(key=key, user_id=user.id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that resolves the token to a lightweight principal
+    (id, role, employer_id, is_active) through an in-process TTL/LRU cache and
+    an optional shared Django cache, so cached requests issue no auth query.
+    """
+    def authenticate_credentials(self, key):
+        values = get_cached_principal_values(key)
+        if values is None:
+            values = fetch_principal_values(key)
+            if values is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache_principal_values(key, values)
+        return principal_for_token(values, key)
+
+
+async def aauthenticate_token(request):
+    """
+    Authenticate a plain Django request carrying an `Authorization: Token <key>` header,
+    for async views running outside DRF.
+    :param request: Django HttpRequest
+    :return: Tuple of (user, token), or None if the request carries no token
+    """
+    authentication = CachedTokenAuthentication()
+    auth = authentication.authenticate_header(request)
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if not header or header[0].lower() != auth.lower():
+        return None
+    if len(header) != 2:
+        raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+    key = header[1]
+    values = await aget_cached_principal_values(key)
+    if values is None:
+        values = await afetch_principal_values(key)
+        if values is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        await acache_principal_values(key, values)
+    return principal_for_token(values, key)
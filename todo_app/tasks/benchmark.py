@@ -0,0 +1,104 @@
+import json
+import math
+from contextlib import contextmanager
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from rest_framework.authtoken.models import Token
+from .models import Task, UserProfile
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an already sorted list.
+    :param sorted_values: Sorted list of numbers
+    :param fraction: Percentile as a fraction, e.g. 0.95
+    :return: Value at that percentile, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies):
+    """
+    Summarize request latencies in milliseconds.
+    :param latencies: List of latencies in seconds
+    :return: Dict with count, mean, p50, p95 and p99 in milliseconds
+    """
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        'count': count,
+        'mean_ms': round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+    }
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """
+    Run the enclosed benchmark against throwaway test databases, like the test runner does.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+def write_results(path, results):
+    """
+    Save benchmark results as JSON.
+    :param path: Output file path
+    :param results: JSON serializable results
+    """
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+
+
+def seed_data(employers, employees_per_employer, tasks_per_employee, password='bench-password-1'):
+    """
+    Seed realistic data: employers and employees created through CustomUserManager,
+    tasks inserted with bulk_create, and a token for every user.
+    :param employers: Number of employers
+    :param employees_per_employer: Number of employees of each employer
+    :param tasks_per_employee: Number of tasks of each employee
+    :param password: Password of every seeded user
+    :return: Dict with the seeded employer and employee IDs and tokens
+    """
+    seeded = {'employers': [], 'employees': {}, 'tokens': {}}
+    statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+    for employer_index in range(employers):
+        employer = UserProfile.objects.create_user(
+            phone_number=f'1{employer_index:09d}', password=password, role='employer'
+        )
+        seeded['employers'].append(employer.id)
+        seeded['employees'][employer.id] = []
+        tasks = []
+        for employee_index in range(employees_per_employer):
+            employee = UserProfile.objects.create_user(
+                phone_number=f'2{employer_index:04d}{employee_index:05d}', password=password,
+                role='employee', employer=employer,
+            )
+            seeded['employees'][employer.id].append(employee.id)
+            tasks.extend(
+                Task(
+                    title=f'Task {task_index} of {employee.phone_number}',
+                    description='Seeded by the benchmark suite. ' * 4,
+                    status=statuses[task_index % len(statuses)],
+                    employer=employer,
+                    employee=employee,
+                )
+                for task_index in range(tasks_per_employee)
+            )
+        Task.objects.bulk_create(tasks, batch_size=1000)
+    for token in Token.objects.bulk_create(
+        Token(key=Token.generate_key(), user_id=user_id)
+        for user_id in UserProfile.objects.values_list('id', flat=True)
+    ):
+        seeded['tokens'][token.user_id] = token.key
+    return seeded
@@ -0,0 +1,86 @@
+import gzip
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'CONTENT_TYPES': ['application/json', 'application/msgpack', 'text/'],
+}
+
+
+def compression_settings():
+    """
+    Read the TASKS_COMPRESSION setting merged over the defaults.
+    :return: Dict of compression settings
+    """
+    return {**DEFAULT_COMPRESSION, **getattr(settings, 'TASKS_COMPRESSION', {})}
+
+
+def available_encodings():
+    """
+    :return: Content codings this process can produce, preferred first
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _quality(params):
+    for param in params.split(';'):
+        name, _, value = param.strip().partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the preferred content coding the client accepts.
+    :param accept_encoding: Accept-Encoding header value
+    :return: 'br', 'gzip' or None to send the body as is
+    """
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if name:
+            accepted[name] = _quality(params)
+    candidates = [
+        (accepted.get(encoding, accepted.get('*', 0.0)), -index, encoding)
+        for index, encoding in enumerate(available_encodings())
+    ]
+    quality, _, encoding = max(candidates)
+    return encoding if quality > 0 else None
+
+
+def compress(data, encoding, config=None):
+    """
+    Compress a response body.
+    :param data: Bytes
+    :param encoding: 'br' or 'gzip'
+    :param config: Compression settings, read from TASKS_COMPRESSION when omitted
+    :return: Compressed bytes
+    """
+    config = config or compression_settings()
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['BROTLI_QUALITY'])
+    # A fixed mtime keeps the output of identical bodies identical.
+    return gzip.compress(data, compresslevel=config['GZIP_LEVEL'], mtime=0)
+
+
+def is_compressible(content_type, config):
+    """
+    :param content_type: Content-Type header value
+    :param config: Compression settings
+    :return: Whether bodies of this type are worth compressing
+    """
+    content_type = content_type.split(';')[0].strip().lower()
+    return any(content_type.startswith(prefix) for prefix in config['CONTENT_TYPES'])
@@ -0,0 +1,291 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_EVENTS = {
+    'BROKER': 'tasks.events.InProcessBroker',
+    'REPLAY_SIZE': 1000,
+    'QUEUE_SIZE': 1000,
+    'IDLE_TIMEOUT': 300,
+    'KEEPALIVE': 15,
+    'RETRY': 3000,
+}
+
+TASK_CREATED = 'task.created'
+TASK_UPDATED = 'task.updated'
+TASK_STATUS = 'task.status'
+TASK_DELETED = 'task.deleted'
+# Sent instead of a replay the broker cannot provide; the client should reload its list.
+RESET = 'reset'
+
+
+def events_settings():
+    """
+    Read the TASKS_EVENTS setting merged over the defaults.
+    :return: Dict of event settings
+    """
+    return {**DEFAULT_EVENTS, **getattr(settings, 'TASKS_EVENTS', {})}
+
+
+class Event:
+    """
+    One Server-Sent Event.
+    """
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def encode(self):
+        """
+        :return: The event in the text/event-stream format
+        """
+        return f'id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, separators=(",", ":"))}\n\n'
+
+
+class Subscription:
+    """
+    Events of one channel delivered to one connected client. Events may be delivered
+    from any thread; they are handed to the subscriber's event loop.
+    """
+    def __init__(self, broker, channel, queue_size):
+        self.broker = broker
+        self.channel = channel
+        self.queue_size = queue_size
+        self.overflowed = False
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def deliver(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The subscriber's event loop is gone.
+            self.close()
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        if self._queue.qsize() >= self.queue_size:
+            # A client that cannot keep up is disconnected and resumes from its last event ID.
+            self.overflowed = True
+            event = None
+        self._queue.put_nowait(event)
+
+    async def get(self):
+        """
+        Wait for the next event.
+        :return: Event, or None once the subscription overflowed
+        """
+        return await self._queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    """
+    Publish/subscribe fan-out of task events, one channel per employer. Replace
+    InProcessBroker through TASKS_EVENTS['BROKER'] with an implementation backed by a
+    shared service when events are published and streamed by different processes.
+    """
+    def publish(self, channel, event_type, data):
+        """
+        Send an event to the subscribers of a channel.
+        :param channel: Channel name
+        :param event_type: Event type
+        :param data: JSON serializable event data
+        :return: Published Event
+        """
+        raise NotImplementedError
+
+    def subscribe(self, channel, last_event_id=None):
+        """
+        Start receiving the events of a channel. Must be called from the subscriber's event loop.
+        :param channel: Channel name
+        :param last_event_id: ID of the last event the client received, to resume after it
+        :return: Tuple of (Subscription, list of missed events or None when they cannot be replayed)
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+    def reset_event(self, channel):
+        """
+        Event telling a client to reload, carrying the channel's current ID so the client resumes from there.
+        :param channel: Channel name
+        :return: Event
+        """
+        raise NotImplementedError
+
+
+class _Channel:
+    __slots__ = ('start', 'sequence', 'history', 'subscribers', 'idle_since')
+
+    def __init__(self, sequence, replay_size):
+        # Every event of the channel after `start` is in the history.
+        self.start = self.sequence = sequence
+        self.history = deque(maxlen=replay_size)
+        self.subscribers = set()
+        self.idle_since = None
+
+
+class InProcessBroker(BaseBroker):
+    """
+    Broker keeping the channels and the replay history in this process. Only channels
+    with a subscriber, or that had one in the last IDLE_TIMEOUT seconds so a client can
+    reconnect, are kept; events of other channels are not recorded. The history holds the
+    type and task ID of each event, so replayed events carry only {"id": ...}.
+    Event IDs are prefixed with the broker's epoch and numbered across all channels, so
+    IDs handed out before a restart or an eviction are answered with a reset instead of
+    a wrong replay.
+    """
+    def __init__(self):
+        config = events_settings()
+        self.replay_size = config['REPLAY_SIZE']
+        self.queue_size = config['QUEUE_SIZE']
+        self.idle_timeout = config['IDLE_TIMEOUT']
+        self.epoch = format(time.time_ns(), 'x')
+        self._sequence = 0
+        self._channels = {}
+        self._next_sweep = 0
+        self._lock = threading.Lock()
+
+    def _event_id(self, sequence):
+        return f'{self.epoch}-{sequence}'
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.idle_timeout
+        expired = now - self.idle_timeout
+        for channel in [
+            channel for channel, state in self._channels.items()
+            if not state.subscribers and state.idle_since <= expired
+        ]:
+            del self._channels[channel]
+
+    def publish(self, channel, event_type, data):
+        with self._lock:
+            self._sequence += 1
+            event = Event(self._event_id(self._sequence), event_type, data)
+            state = self._channels.get(channel)
+            if state is None:
+                return event
+            if len(state.history) == state.history.maxlen:
+                state.start = state.history[0][0] if state.history else self._sequence
+            state.history.append((self._sequence, event_type, data.get('id')))
+            state.sequence = self._sequence
+            subscribers = list(state.subscribers)
+            self._evict_idle()
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return event
+
+    def subscribe(self, channel, last_event_id=None):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._evict_idle()
+            state = self._channels.get(channel)
+            if state is None:
+                state = self._channels[channel] = _Channel(self._sequence, self.replay_size)
+            state.subscribers.add(subscription)
+            state.idle_since = None
+            if last_event_id is None:
+                return subscription, []
+            return subscription, self._missed(state, last_event_id)
+
+    def _missed(self, state, last_event_id):
+        epoch, _, sequence = last_event_id.partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence < state.start or sequence > state.sequence:
+            return None
+        return [
+            Event(self._event_id(event_sequence), event_type, {'id': task_id})
+            for event_sequence, event_type, task_id in state.history if event_sequence > sequence
+        ]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            state = self._channels.get(subscription.channel)
+            if state is not None:
+                state.subscribers.discard(subscription)
+                if not state.subscribers:
+                    state.idle_since = time.monotonic()
+
+    def reset_event(self, channel):
+        with self._lock:
+            state = self._channels.get(channel)
+            sequence = state.sequence if state is not None else self._sequence
+        return Event(self._event_id(sequence), RESET, {})
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Return the process wide broker configured by TASKS_EVENTS['BROKER'], creating it on first use.
+    :return: BaseBroker instance
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(events_settings()['BROKER'])()
+    return _broker
+
+
+def publish_on_commit(channel, event_type, data):
+    """
+    Publish an event once the current transaction commits, so clients never hear of
+    changes that were rolled back.
+    :param channel: Channel name
+    :param event_type: Event type
+    :param data: JSON serializable event data
+    """
+    publish_many_on_commit([(channel, event_type, data)])
+
+
+def publish_many_on_commit(events):
+    """
+    Publish a batch of events once the current transaction commits.
+    :param events: List of (channel, event type, data) tuples
+    """
+    events = [event for event in events if event[0] is not None]
+    if not events:
+        return
+
+    def publish():
+        broker = get_broker()
+        for channel, event_type, data in events:
+            broker.publish(channel, event_type, data)
+    transaction.on_commit(publish)
+
+
+def task_event_type(task, created=False):
+    """
+    Classify a task save from the values the task was loaded with.
+    :param task: Saved Task
+    :param created: Whether the save created the task
+    :return: TASK_CREATED, TASK_STATUS when only the status changed, or TASK_UPDATED
+    """
+    if created:
+        return TASK_CREATED
+    loaded_values = getattr(task, '_loaded_values', None)
+    if not loaded_values or 'status' not in loaded_values:
+        return TASK_UPDATED
+    changed = {name for name, value in loaded_values.items() if getattr(task, name) != value}
+    return TASK_STATUS if 'status' in changed and changed <= {'status', 'updated_at'} else TASK_UPDATED
@@ -0,0 +1,109 @@
+import csv
+import json
+import zlib
+from django.conf import settings
+from .rows import TASK_FIELDS, columns, iter_rows
+
+EXPORT_FIELDS = TASK_FIELDS
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+DEFAULT_CHUNK_SIZE = 2000
+# Size of the blocks handed to the WSGI/ASGI server, large enough to avoid tiny writes.
+BLOCK_SIZE = 64 * 1024
+
+
+def iter_task_rows(queryset):
+    """
+    Iterate over the export rows of a queryset with a server side cursor.
+    :param queryset: Task queryset
+    :return: Generator of dicts in EXPORT_FIELDS order
+    """
+    chunk_size = getattr(settings, 'TASKS_EXPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    return iter_rows(EXPORT_FIELDS, queryset.values_list(*columns(EXPORT_FIELDS)).iterator(chunk_size=chunk_size))
+
+
+def ndjson_lines(rows):
+    """
+    Encode rows as newline delimited JSON objects.
+    :param rows: Iterable of dicts in EXPORT_FIELDS order
+    :return: Generator of lines
+    """
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _LineBuffer:
+    """
+    File-like object that hands back what csv.writer writes to it.
+    """
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """
+    Encode rows as CSV with a header line.
+    :param rows: Iterable of dicts in EXPORT_FIELDS order
+    :return: Generator of lines
+    """
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row.values())
+
+
+def _blocks(lines):
+    """
+    Join encoded lines into blocks of roughly BLOCK_SIZE bytes.
+    The first line is sent on its own so the client gets the first byte right away.
+    :param lines: Iterable of strings
+    :return: Generator of bytes
+    """
+    buffer, size, first = [], 0, True
+    for line in lines:
+        data = line.encode()
+        if first:
+            first = False
+            yield data
+            continue
+        buffer.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzip(blocks):
+    """
+    Compress a stream of blocks into a single gzip member.
+    :param blocks: Iterable of bytes
+    :return: Generator of bytes
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    first = True
+    for block in blocks:
+        data = compressor.compress(block)
+        if first:
+            # Flush the header line so the first compressed bytes go out immediately.
+            first = False
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_tasks(queryset, output, compress=False):
+    """
+    Stream the tasks of a queryset in constant memory.
+    :param queryset: Task queryset
+    :param output: One of EXPORT_FORMATS
+    :param compress: Whether to gzip the stream
+    :return: Generator of bytes
+    """
+    encode = csv_lines if output == 'csv' else ndjson_lines
+    blocks = _blocks(encode(iter_task_rows(queryset)))
+    return _gzip(blocks) if compress else blocks
@@ -0,0 +1,374 @@
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from . import archive
+from .events import TASK_DELETED, TASK_UPDATED, publish_many_on_commit
+from .export import EXPORT_FORMATS, stream_tasks
+from .models import Job, Task, TaskTombstone, UserProfile
+from .pagination import filter_tasks
+from .serializers import TaskSerializer
+from .versioning import bump_task_versions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = {
+    'BATCH_SIZE': 1000,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 10,
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL': 1.0,
+    'EXPORT_DIR': None,
+    # Days export files are kept before the clean_exports job deletes them.
+    'EXPORT_RETENTION_DAYS': 7,
+    'SCHEDULE': {},
+}
+# Seconds between two checks of TASKS_JOBS['SCHEDULE'] by a worker.
+SCHEDULE_CHECK_INTERVAL = 60
+
+# Jobs a client may still be waiting on.
+PENDING = (Job.QUEUED, Job.RUNNING)
+
+DELETE_EMPLOYEE = 'delete_employee'
+REASSIGN_TASKS = 'reassign_tasks'
+EXPORT_TASKS = 'export_tasks'
+ARCHIVE_TASKS = 'archive_tasks'
+CLEAN_EXPORTS = 'clean_exports'
+
+# Shown to the job owner; the exception itself only goes to the log.
+RETRY_ERROR = 'The job failed and will be retried.'
+FAILED_ERROR = 'The job failed.'
+
+_handlers = {}
+
+
+class JobLost(Exception):
+    """
+    Raised inside a handler when its lease expired and another worker took the job over.
+    """
+
+
+def jobs_settings():
+    """
+    Read the TASKS_JOBS setting merged over the defaults.
+    :return: Dict of job settings
+    """
+    return {**DEFAULT_JOBS, **getattr(settings, 'TASKS_JOBS', {})}
+
+
+def job_handler(kind):
+    """
+    Register the function running the jobs of the given kind. The handler receives the
+    claimed Job and returns its JSON serializable result.
+    :param kind: Job kind
+    :return: Decorator
+    """
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+def enqueue(kind, owner, payload, run_after=None, pending_key=None):
+    """
+    Queue a job for the run_jobs workers.
+    :param kind: Registered job kind
+    :param owner: User allowed to see the job, None for maintenance jobs
+    :param payload: JSON serializable arguments of the handler
+    :param run_after: Time before which the job is not run, now when omitted
+    :param pending_key: Optional key no other unfinished job may hold; IntegrityError when one does
+    :return: Job
+    """
+    if kind not in _handlers:
+        raise ValueError(f'Unknown job kind: {kind}')
+    return Job.objects.create(
+        kind=kind, owner=owner, payload=payload, run_after=run_after or timezone.now(), pending_key=pending_key,
+    )
+
+
+def pending_job(kind, owner, **payload):
+    """
+    Find a queued or running job of the owner with the given payload values, so repeated
+    requests reuse it instead of queueing the same work twice.
+    :param kind: Job kind
+    :param owner: Job owner
+    :return: Job or None
+    """
+    lookups = {f'payload__{key}': value for key, value in payload.items()}
+    return Job.objects.filter(kind=kind, owner=owner, status__in=PENDING, **lookups).order_by('id').first()
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def schedule_jobs():
+    """
+    Queue the next run of every job kind in TASKS_JOBS['SCHEDULE'] (kind -> interval in
+    seconds) that has no run pending, one interval after the previous run started.
+    Every worker does this, so the runs carry a pending_key: when two workers race, the
+    second insert fails on the unique key instead of queueing the run twice.
+    """
+    for kind, interval in jobs_settings()['SCHEDULE'].items():
+        if pending_job(kind, None) is not None:
+            continue
+        last = Job.objects.filter(kind=kind, owner=None).order_by('-id').first()
+        run_after = None
+        if last is not None:
+            run_after = (last.started_at or last.created_at) + timedelta(seconds=interval)
+        try:
+            with transaction.atomic():
+                enqueue(kind, None, {}, run_after, pending_key=f'schedule:{kind}')
+        except IntegrityError:
+            pass
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=jobs_settings()['LEASE_SECONDS'])
+    return Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+
+
+def claim_job(worker):
+    """
+    Claim the oldest runnable job, including running jobs whose worker stopped renewing
+    its lease. The claim is a conditional UPDATE, so when several workers race for the
+    same row exactly one of them gets it and the others move on to the next candidate.
+    :param worker: Name of the claiming worker
+    :return: Claimed Job, or None when the queue is empty
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(_claimable(now)).order_by('id').values_list('id', flat=True)[:10]
+    for job_id in candidates:
+        claimed = Job.objects.filter(_claimable(now), id=job_id).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def heartbeat(job, progress):
+    """
+    Record a handler's progress and renew the job's lease.
+    :param job: Running Job
+    :param progress: Number of items processed so far
+    """
+    renewed = Job.objects.filter(id=job.id, status=Job.RUNNING, locked_by=job.locked_by).update(
+        progress=progress, locked_at=timezone.now(),
+    )
+    if not renewed:
+        raise JobLost(f'Job {job.id} was taken over by another worker.')
+    job.progress = progress
+
+
+def run_job(job):
+    """
+    Run a claimed job and store its result, retrying failures with a growing delay
+    until TASKS_JOBS['MAX_ATTEMPTS'] is reached.
+    :param job: Job returned by claim_job
+    """
+    config = jobs_settings()
+    owned = Job.objects.filter(id=job.id, locked_by=job.locked_by)
+    try:
+        if job.attempts > config['MAX_ATTEMPTS']:
+            raise RuntimeError('Lease expired on every attempt.')
+        result = _handlers[job.kind](job)
+    except JobLost:
+        logger.warning('Job %s was taken over by another worker', job.id)
+        return
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %s', job.id, job.kind, job.attempts)
+        if job.attempts < config['MAX_ATTEMPTS']:
+            owned.update(
+                status=Job.QUEUED, error=RETRY_ERROR, locked_by='', locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=config['RETRY_DELAY'] * job.attempts),
+            )
+        else:
+            owned.update(status=Job.FAILED, error=FAILED_ERROR, finished_at=timezone.now(), pending_key=None)
+        return
+    owned.update(status=Job.SUCCEEDED, result=result, error='', finished_at=timezone.now(), pending_key=None)
+
+
+def work(worker=None, stop=None, burst=False):
+    """
+    Claim and run jobs until stopped.
+    :param worker: Worker name, defaults to host:pid
+    :param stop: Optional threading/multiprocessing Event ending the loop
+    :param burst: Return as soon as the queue is empty
+    :return: Number of jobs run
+    """
+    worker = worker or worker_name()
+    poll_interval = jobs_settings()['POLL_INTERVAL']
+    done, next_schedule = 0, 0.0
+    while stop is None or not stop.is_set():
+        try:
+            if time.monotonic() >= next_schedule:
+                schedule_jobs()
+                next_schedule = time.monotonic() + SCHEDULE_CHECK_INTERVAL
+            job = claim_job(worker)
+        except DatabaseError:
+            logger.exception('Worker %s could not poll the job queue', worker)
+            close_old_connections()
+            job = None
+        if job is None:
+            if burst:
+                break
+            if stop is None:
+                time.sleep(poll_interval)
+            else:
+                stop.wait(poll_interval)
+            continue
+        run_job(job)
+        done += 1
+    return done
+
+
+def _batches(queryset, batch_size):
+    """
+    Yield the IDs of a task queryset in batches, re-running the query each time so every
+    batch only sees the rows the previous batches left behind.
+    """
+    while True:
+        task_ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not task_ids:
+            return
+        yield task_ids
+
+
+@job_handler(DELETE_EMPLOYEE)
+def delete_employee(job):
+    """
+    Delete an employee, first removing their tasks in batches so no single transaction
+    has to lock the whole task history.
+    """
+    employee_id = job.payload['employee_id']
+    tasks = Task.objects.filter(employee_id=employee_id, employer_id=job.owner_id)
+    deleted = 0
+    for task_ids in _batches(tasks, jobs_settings()['BATCH_SIZE']):
+        with transaction.atomic():
+            TaskTombstone.objects.bulk_create(
+                TaskTombstone(task_id=task_id, employer_id=job.owner_id, employee_id=employee_id) for task_id in task_ids
+            )
+            # The tombstones, version bumps and events of the post_delete signal are done in bulk
+            # around it, so the batch is removed with a single DELETE instead of row by row.
+            Task.delete_rows(task_ids, router.db_for_write(Task))
+            bump_task_versions([job.owner_id], [employee_id])
+            publish_many_on_commit([(job.owner_id, TASK_DELETED, {'id': task_id}) for task_id in task_ids])
+        deleted += len(task_ids)
+        heartbeat(job, deleted)
+    UserProfile.objects.filter(id=employee_id, employer_id=job.owner_id, role='employee').delete()
+    return {'employee_id': employee_id, 'deleted_tasks': deleted}
+
+
+@job_handler(REASSIGN_TASKS)
+def reassign_tasks(job):
+    """
+    Move every task of one employee to another employee of the same employer, in batches.
+    """
+    from_employee_id = job.payload['from_employee']
+    to_employee_id = job.payload['to_employee']
+    tasks = Task.objects.filter(employee_id=from_employee_id, employer_id=job.owner_id)
+    reassigned = 0
+    for task_ids in _batches(tasks, jobs_settings()['BATCH_SIZE']):
+        with transaction.atomic():
+            TaskTombstone.objects.bulk_create(
+                TaskTombstone(task_id=task_id, employee_id=from_employee_id) for task_id in task_ids
+            )
+            Task.objects.filter(id__in=task_ids).update(
+                employee_id=to_employee_id, updated_at=timezone.now(),
+            )
+            bump_task_versions([job.owner_id], [from_employee_id, to_employee_id])
+            publish_many_on_commit([
+                (job.owner_id, TASK_UPDATED, data)
+                for data in TaskSerializer(Task.objects.filter(id__in=task_ids).order_by('id'), many=True).data
+            ])
+        reassigned += len(task_ids)
+        heartbeat(job, reassigned)
+    return {'from_employee': from_employee_id, 'to_employee': to_employee_id, 'reassigned_tasks': reassigned}
+
+
+@job_handler(ARCHIVE_TASKS)
+def archive_tasks(job):
+    """
+    Move the finished tasks older than TASKS_ARCHIVE['AFTER_DAYS'] (or the payload's
+    after_days) into the archive table.
+    """
+    cutoff = archive.archive_cutoff(job.payload.get('after_days'))
+    archived = archive.archive_tasks(cutoff, progress=lambda total: heartbeat(job, total))
+    return {'cutoff': cutoff.isoformat(), 'archived_tasks': archived}
+
+
+def _export_extension(payload):
+    return payload['output'] + ('.gz' if payload.get('gzip') else '')
+
+
+def export_dir():
+    """
+    :return: Directory of the files written by export jobs
+    """
+    return jobs_settings()['EXPORT_DIR'] or os.path.join(settings.BASE_DIR, 'exports')
+
+
+def export_path(job):
+    """
+    Path of the file written by an export job.
+    :param job: Export Job
+    :return: Absolute file path
+    """
+    return os.path.join(export_dir(), f'job-{job.id}.{_export_extension(job.payload)}')
+
+
+@job_handler(EXPORT_TASKS)
+def export_tasks(job):
+    """
+    Write an employer's task export to a file served by the job download endpoint.
+    """
+    output = job.payload['output']
+    compress = job.payload.get('gzip', False)
+    tasks = filter_tasks(Task.objects.filter(employer_id=job.owner_id), job.payload.get('filters', {}))
+    path = export_path(job)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = 0
+    try:
+        with open(path + '.part', 'wb') as export_file:
+            for block in stream_tasks(tasks.order_by('created_at', 'id'), output, compress):
+                export_file.write(block)
+                size += len(block)
+        os.replace(path + '.part', path)
+    finally:
+        # Only left behind when the export failed.
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+    return {
+        'filename': f'tasks.{_export_extension(job.payload)}',
+        'content_type': 'application/gzip' if compress else EXPORT_FORMATS[output],
+        'size': size,
+    }
+
+
+@job_handler(CLEAN_EXPORTS)
+def clean_exports(job):
+    """
+    Delete the export files, and the partial files of exports whose worker died, last
+    written more than TASKS_JOBS['EXPORT_RETENTION_DAYS'] days ago. Downloading the
+    export of a cleaned up job answers 410 Gone.
+    """
+    cutoff = time.time() - jobs_settings()['EXPORT_RETENTION_DAYS'] * 86400
+    removed = 0
+    try:
+        entries = list(os.scandir(export_dir()))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if entry.name.startswith('job-') and entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+    return {'removed_files': removed}
@@ -0,0 +1,81 @@
+import os
+import threading
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.db import IntegrityError
+from rest_framework.authtoken.models import Token
+from .models import UserProfile
+
+
+class LoginBusy(Exception):
+    """
+    Raised when no password hashing slot frees up within TASKS_LOGIN_QUEUE_TIMEOUT.
+    """
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def _hashing_slots():
+    """
+    Return the process wide semaphore bounding concurrent password hashing.
+    TASKS_LOGIN_MAX_CONCURRENCY defaults to the number of CPUs.
+    :return: BoundedSemaphore
+    """
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                limit = getattr(settings, 'TASKS_LOGIN_MAX_CONCURRENCY', None) or os.cpu_count() or 1
+                _slots = threading.BoundedSemaphore(limit)
+    return _slots
+
+
+def _check_password(user, password):
+    """
+    Verify a password while holding a hashing slot, so that a login storm cannot
+    occupy every worker thread with hashing. A hash made with an outdated policy
+    is transparently rehashed with the preferred hasher by check_password().
+    :param user: UserProfile, or None to burn the same time on an unknown phone number
+    :param password: Raw password
+    :return: True if the password matches
+    """
+    slots = _hashing_slots()
+    if not slots.acquire(timeout=getattr(settings, 'TASKS_LOGIN_QUEUE_TIMEOUT', 2)):
+        raise LoginBusy
+    try:
+        if user is None:
+            # Run the default hasher once so unknown users take as long as known ones.
+            UserProfile().set_password(password)
+            return False
+        return user.check_password(password)
+    finally:
+        slots.release()
+
+
+def login_user(request, phone_number, password):
+    """
+    Authenticate a user by phone number and password and return their token,
+    loading the user and any existing token with a single query.
+    :param request: User Request Object
+    :param phone_number: Phone number
+    :param password: Raw password
+    :return: Tuple of (user, token), or (None, None) if the credentials are invalid
+    """
+    user = None
+    if phone_number and password:
+        user = UserProfile.objects.select_related('auth_token').filter(phone_number=phone_number).first()
+    if not phone_number or not password or not _check_password(user, password) or not user.is_active:
+        credentials = {'phone_number': phone_number, 'password': '********************'}
+        user_login_failed.send(sender=__name__, credentials=credentials, request=request)
+        return None, None
+
+    try:
+        token = user.auth_token
+    except Token.DoesNotExist:
+        try:
+            token = Token.objects.create(user=user)
+        except IntegrityError:
+            token = Token.objects.get(user=user)
+    return user, token
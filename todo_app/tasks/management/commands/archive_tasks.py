@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from tasks import archive
+from tasks.jobs import ARCHIVE_TASKS, enqueue, pending_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the finished tasks not updated for TASKS_ARCHIVE["AFTER_DAYS"] days from the task table into the '
+        'archive table, in batches of short transactions. Run it from cron, or schedule the archive_tasks job '
+        'in TASKS_JOBS["SCHEDULE"] to have the run_jobs workers do it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after-days', type=int, help='Archive tasks finished more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, help='Tasks moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tasks that would be archived.')
+        parser.add_argument('--background', action='store_true', help='Queue a job for the run_jobs workers instead.')
+
+    def handle(self, *args, **options):
+        cutoff = archive.archive_cutoff(options['after_days'])
+        if options['dry_run']:
+            count = archive.archivable_tasks(cutoff).count()
+            self.stdout.write(f'{count} tasks finished before {cutoff.isoformat()} would be archived.')
+            return
+        if options['background']:
+            payload = {} if options['after_days'] is None else {'after_days': options['after_days']}
+            job = pending_job(ARCHIVE_TASKS, None, **payload) or enqueue(ARCHIVE_TASKS, None, payload)
+            self.stdout.write(f'Archive job {job.id} is {job.status}.')
+            return
+
+        def progress(total):
+            self.stdout.write(f'Archived {total} tasks...')
+
+        archived = archive.archive_tasks(cutoff, options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} tasks finished before {cutoff.isoformat()}.'))
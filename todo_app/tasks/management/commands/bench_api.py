@@ -0,0 +1,322 @@
+import asyncio
+import itertools
+import json
+import tempfile
+import time
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from tasks import urls
+from tasks.benchmark import seed_data, summarize_latencies, test_database, write_results
+from tasks.jobs import EXPORT_TASKS, enqueue, work
+from tasks.models import Task, UserProfile
+
+PASSWORD = 'bench-password-1'
+
+
+class Scenarios:
+    """
+    One request builder per route of tasks/urls.py. Each builder returns
+    (role, method, path, payload) and may use fresh rows so destructive routes
+    such as the deletes can be called repeatedly.
+    """
+    # Read-only routes, also driven concurrently through the ASGI handler.
+    READ_ROUTES = (
+        'view_tasks', 'export_tasks', 'task_changes', 'search_tasks', 'task_stats', 'view_employee_tasks',
+        'view_employees', 'job_status', 'async_view_tasks', 'async_view_employee_tasks',
+    )
+    # Routes that cannot be timed as single requests, with the reason.
+    SKIPPED_ROUTES = {
+        'async_task_events': 'endless Server-Sent Events stream',
+    }
+
+    def __init__(self, seeded):
+        self.seeded = seeded
+        self.employer_id = seeded['employers'][0]
+        self.employee_ids = seeded['employees'][self.employer_id]
+        self.employee_id = self.employee_ids[0]
+        self.counter = itertools.count()
+
+    def token(self, role):
+        return self.seeded['tokens'][self.employer_id if role == 'employer' else self.employee_id]
+
+    def _task_ids(self, **filters):
+        return list(Task.objects.filter(employer_id=self.employer_id, **filters).values_list('id', flat=True))
+
+    def prepare(self, requests):
+        """
+        Create the rows consumed by destructive scenarios.
+        :param requests: Number of requests per scenario
+        """
+        Task.objects.bulk_create(
+            Task(title=f'Disposable {i}', description='Deleted by the benchmark.', employer_id=self.employer_id,
+                 employee_id=self.employee_id)
+            for i in range(requests)
+        )
+        self.disposable_tasks = iter(self._task_ids(title__startswith='Disposable'))
+        self.disposable_employees = iter([
+            UserProfile.objects.create_user(
+                phone_number=f'3{i:09d}', password=PASSWORD, role='employee', employer_id=self.employer_id
+            ).id
+            for i in range(requests)
+        ])
+        self.employee_task_ids = list(
+            Task.objects.filter(employee_id=self.employee_id).exclude(title__startswith='Disposable')
+            .order_by('id').values_list('id', flat=True)[:50]
+        )
+        # A finished export job for the job routes.
+        self.export_job = enqueue(EXPORT_TASKS, UserProfile.objects.get(id=self.employer_id), {'output': 'ndjson'})
+        work(burst=True)
+
+    def build(self, route):
+        return getattr(self, route)()
+
+    def login(self):
+        return None, 'post', '/login/', {'phone_number': '1000000000', 'password': PASSWORD}
+
+    def view_tasks(self):
+        return 'employer', 'get', '/tasks/', None
+
+    def add_task(self):
+        return 'employer', 'post', '/tasks/add/', {
+            'title': 'Benchmark task', 'description': 'Added by the benchmark.', 'employee': self.employee_id,
+        }
+
+    def export_tasks(self):
+        return 'employer', 'get', '/tasks/export/', None
+
+    def search_tasks(self):
+        return 'employer', 'get', '/tasks/search/?q=seeded', None
+
+    def task_stats(self):
+        return 'employer', 'get', '/tasks/stats/', None
+
+    def task_changes(self):
+        return 'employee', 'get', '/tasks/changes/', None
+
+    def edit_task(self):
+        task_id = self.employee_task_ids[next(self.counter) % len(self.employee_task_ids)]
+        return 'employer', 'put', f'/tasks/{task_id}/edit/', {
+            'title': 'Edited', 'description': 'Edited by the benchmark.', 'status': 'blocked',
+            'employee': self.employee_id,
+        }
+
+    def delete_task(self):
+        return 'employer', 'delete', f'/tasks/{next(self.disposable_tasks)}/delete/', None
+
+    def update_task_status(self):
+        task_id = self.employee_task_ids[next(self.counter) % len(self.employee_task_ids)]
+        return 'employee', 'patch', f'/tasks/{task_id}/status/', {'status': 'finished'}
+
+    def view_employee_tasks(self):
+        return 'employee', 'get', '/tasks/employee/', None
+
+    def bulk_add_tasks(self):
+        return 'employer', 'post', '/tasks/bulk/add/', [
+            {'title': f'Bulk {i}', 'description': 'Bulk added by the benchmark.', 'employee': self.employee_id}
+            for i in range(20)
+        ]
+
+    def bulk_edit_tasks(self):
+        return 'employer', 'patch', '/tasks/bulk/edit/', [
+            {'id': task_id, 'status': 'blocked'} for task_id in self.employee_task_ids[:20]
+        ]
+
+    def bulk_update_task_status(self):
+        return 'employee', 'patch', '/tasks/bulk/status/', [
+            {'id': task_id, 'status': 'started'} for task_id in self.employee_task_ids[:20]
+        ]
+
+    def reassign_tasks(self):
+        return 'employer', 'post', '/tasks/reassign/', {
+            'from_employee': self.employee_ids[1], 'to_employee': self.employee_ids[2],
+        }
+
+    def job_status(self):
+        return 'employer', 'get', f'/jobs/{self.export_job.id}/', None
+
+    def job_download(self):
+        return 'employer', 'get', f'/jobs/{self.export_job.id}/download/', None
+
+    def add_employee(self):
+        return 'employer', 'post', '/employees/add/', {'phone_number': f'4{next(self.counter):09d}', 'password': PASSWORD}
+
+    def delete_employee(self):
+        return 'employer', 'delete', f'/employees/{next(self.disposable_employees)}/delete/', None
+
+    def edit_employee(self):
+        return 'employer', 'patch', f'/employees/{self.employee_ids[-1]}/edit/', {'password': PASSWORD}
+
+    def view_employees(self):
+        return 'employer', 'get', '/employees/', None
+
+    def async_view_tasks(self):
+        return 'employer', 'get', '/async/tasks/', None
+
+    def async_view_employee_tasks(self):
+        return 'employee', 'get', '/async/tasks/employee/', None
+
+    def async_update_task_status(self):
+        task_id = self.employee_task_ids[next(self.counter) % len(self.employee_task_ids)]
+        return 'employee', 'patch', f'/async/tasks/{task_id}/status/', {'status': 'blocked'}
+
+    def calculate_tax(self):
+        return 'employee', 'post', '/tax/', {'incomes': [250000 * (i % 12) for i in range(100)]}
+
+    def metrics(self):
+        return None, 'get', '/metrics', None
+
+
+def _route_name(pattern):
+    """
+    Name a route after its view function, e.g. view_tasks or async_view_tasks.
+    DRF's api_view wraps the function in a class carrying its name.
+    """
+    view = pattern.callback
+    prefix = 'async_' if view.__module__.endswith('async_views') else ''
+    return prefix + getattr(view, 'cls', view).__name__
+
+
+# Every route of tasks/urls.py, each benchmarked by the Scenarios method of the same name.
+ROUTES = [_route_name(pattern) for pattern in urls.urlpatterns]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed N employers with M employees and K tasks each in a throwaway database, drive every route of '
+        'tasks/urls.py through the Django test client and an in-process ASGI load generator, and report '
+        'p50/p95/p99 latency, queries per request and requests per second.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employers', type=int, default=3)
+        parser.add_argument('--employees', type=int, default=20, help='Employees per employer.')
+        parser.add_argument('--tasks', type=int, default=50, help='Tasks per employee.')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per route.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent ASGI clients for the read routes.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 slowdown before a route counts as a regression.')
+
+    def handle(self, *args, **options):
+        if options['employees'] < 3:
+            raise CommandError('--employees must be at least 3: reassign_tasks moves tasks between two other employees.')
+        missing = [route for route in ROUTES if not hasattr(Scenarios, route) and route not in Scenarios.SKIPPED_ROUTES]
+        if missing:
+            raise CommandError('No benchmark scenario for: ' + ', '.join(missing))
+        # Password hashing is measured by bench_login, a cheap hasher keeps it out of these numbers.
+        with override_settings(
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+            TASKS_JOBS={'EXPORT_DIR': tempfile.mkdtemp(prefix='bench_api')},
+            # Every scenario repeats the same route far beyond the production budgets.
+            TASKS_THROTTLE={'ENABLED': False},
+        ), test_database():
+            seeded = seed_data(options['employers'], options['employees'], options['tasks'], PASSWORD)
+            scenarios = Scenarios(seeded)
+            scenarios.prepare(options['requests'])
+            results = {
+                'config': {key: options[key] for key in ('employers', 'employees', 'tasks', 'requests', 'concurrency')},
+                'wsgi': {
+                    route: self._run_wsgi(scenarios, route, options['requests'])
+                    for route in ROUTES if route not in Scenarios.SKIPPED_ROUTES
+                },
+                'asgi': asyncio.run(self._run_asgi(scenarios, options['requests'], options['concurrency'])),
+            }
+
+        self._report(results)
+        for route, reason in Scenarios.SKIPPED_ROUTES.items():
+            self.stdout.write(f'Skipped {route}: {reason}.')
+        if options['output']:
+            write_results(options['output'], results)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = self._regressions(json.load(baseline), results, options['tolerance'])
+            if regressions:
+                raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+            self.stdout.write('No regressions against the baseline.')
+
+    def _client(self, scenarios, role):
+        client = APIClient()
+        if role:
+            client.credentials(HTTP_AUTHORIZATION='Token ' + scenarios.token(role))
+        return client
+
+    def _run_wsgi(self, scenarios, route, requests):
+        latencies, queries = [], 0
+        clients = {}
+        started = time.perf_counter()
+        for _ in range(requests):
+            role, method, path, payload = scenarios.build(route)
+            client = clients.setdefault(role, self._client(scenarios, role))
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = getattr(client, method)(path, payload, format='json')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latencies.append(time.perf_counter() - request_started)
+            if response.status_code >= 400:
+                raise CommandError(f'{route}: {method.upper()} {path} answered {response.status_code}')
+            queries += len(captured)
+        summary = summarize_latencies(latencies)
+        summary['requests_per_second'] = round(requests / (time.perf_counter() - started), 2)
+        summary['queries_per_request'] = round(queries / requests, 2)
+        return summary
+
+    async def _run_asgi(self, scenarios, requests, concurrency):
+        results = {}
+        for route in Scenarios.READ_ROUTES:
+            role, _, path, _ = scenarios.build(route)
+            headers = {'Authorization': 'Token ' + scenarios.token(role)}
+            latencies = []
+            remaining = iter(range(requests))
+
+            async def worker():
+                client = AsyncClient()
+                for _ in remaining:
+                    request_started = time.perf_counter()
+                    response = await client.get(path, headers=headers)
+                    if response.streaming and response.is_async:
+                        async for _chunk in response.streaming_content:
+                            pass
+                    elif response.streaming:
+                        # Like the ASGI handler, consume sync iterators in a thread.
+                        await sync_to_async(b''.join)(response.streaming_content)
+                    latencies.append(time.perf_counter() - request_started)
+                    if response.status_code >= 400:
+                        raise CommandError(f'{route}: GET {path} answered {response.status_code} over ASGI')
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            summary = summarize_latencies(latencies)
+            summary['requests_per_second'] = round(requests / (time.perf_counter() - started), 2)
+            results[route] = summary
+        return results
+
+    def _report(self, results):
+        for mode in ('wsgi', 'asgi'):
+            self.stdout.write(f'\n{mode.upper()}')
+            self.stdout.write(f"{'route':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}")
+            for route, summary in results[mode].items():
+                self.stdout.write(
+                    f"{route:<28}{summary['requests_per_second']:>10}{summary['p50_ms']:>10}{summary['p95_ms']:>10}"
+                    f"{summary['p99_ms']:>10}{summary.get('queries_per_request', ''):>10}"
+                )
+
+    def _regressions(self, baseline, results, tolerance):
+        regressions = []
+        for mode in ('wsgi', 'asgi'):
+            for route, summary in results[mode].items():
+                before = baseline.get(mode, {}).get(route)
+                if not before:
+                    continue
+                if summary['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                    regressions.append(f"{mode} {route}: p95 {before['p95_ms']} ms -> {summary['p95_ms']} ms")
+                if summary.get('queries_per_request', 0) > before.get('queries_per_request', 0):
+                    regressions.append(
+                        f"{mode} {route}: queries/request {before['queries_per_request']} -> {summary['queries_per_request']}"
+                    )
+        return regressions
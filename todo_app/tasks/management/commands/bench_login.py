@@ -0,0 +1,74 @@
+import time
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, get_hashers_by_algorithm
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from tasks.benchmark import summarize_latencies, test_database, write_results
+from tasks.models import UserProfile
+
+PASSWORD = 'bench-password-1'
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput: password checks per second per core for each hasher, and end to end logins.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each measurement.')
+        parser.add_argument('--users', type=int, default=20, help='Users created for the end to end run.')
+        parser.add_argument('--skip-end-to-end', action='store_true', help='Only measure the hashers.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        results = {'policy': settings.PASSWORD_HASHER_POLICY['ALGORITHM'], 'hashers': {}}
+        for algorithm, hasher in get_hashers_by_algorithm().items():
+            try:
+                rate = self._verify_rate(hasher, options['seconds'])
+            except (ValueError, ImportError) as e:
+                self.stdout.write(f'{algorithm:<16} skipped: {e}')
+                continue
+            results['hashers'][algorithm] = {'checks_per_second_per_core': round(rate, 2)}
+            self.stdout.write(f'{algorithm:<16} {rate:10.2f} password checks/s per core')
+
+        if not options['skip_end_to_end']:
+            with override_settings(TASKS_THROTTLE={'ENABLED': False}), test_database():
+                results['end_to_end'] = self._login_rate(options['users'], options['seconds'])
+            summary = results['end_to_end']
+            self.stdout.write(
+                f"login view       {summary['logins_per_second']:10.2f} logins/s, "
+                f"p50 {summary['p50_ms']} ms, p99 {summary['p99_ms']} ms, {summary['queries_per_login']} queries/login"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+
+    def _verify_rate(self, hasher, seconds):
+        encoded = hasher.encode(PASSWORD, hasher.salt())
+        count, started = 0, time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            hasher.verify(PASSWORD, encoded)
+            count += 1
+        return count / (time.perf_counter() - started)
+
+    def _login_rate(self, users, seconds):
+        encoded = get_hasher().encode(PASSWORD, get_hasher().salt())
+        UserProfile.objects.bulk_create(
+            UserProfile(phone_number=f'9{index:09d}', password=encoded) for index in range(users)
+        )
+        client = APIClient()
+        latencies, queries, index = [], 0, 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            payload = {'phone_number': f'9{index % users:09d}', 'password': PASSWORD}
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = client.post('/login/', payload, format='json')
+                latencies.append(time.perf_counter() - request_started)
+            assert response.status_code == 200, response.content
+            queries += len(captured)
+            index += 1
+        elapsed = time.perf_counter() - started
+        summary = summarize_latencies(latencies)
+        summary['logins_per_second'] = round(len(latencies) / elapsed, 2)
+        summary['queries_per_login'] = round(queries / len(latencies), 2)
+        return summary
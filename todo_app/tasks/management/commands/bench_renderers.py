@@ -0,0 +1,62 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from tasks import compression
+from tasks.benchmark import seed_data, test_database, write_results
+from tasks.models import Task
+from tasks.renderers import FastJSONRenderer, MessagePackRenderer, orjson
+from tasks.rows import TASK_FIELDS, build_rows, columns
+
+
+class Command(BaseCommand):
+    help = 'Measure encode time and bytes on the wire of a task list page for each renderer and content coding.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='Tasks in the rendered page.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, the median is reported.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        with test_database():
+            seed_data(1, 100, max(1, options['tasks'] // 100))
+            rows = list(Task.objects.order_by('-created_at', '-id').values_list(*columns(TASK_FIELDS)))
+        page = {'next_cursor': None, 'results': build_rows(TASK_FIELDS, rows)}
+
+        # (encoder setting, renderer) pairs; the setting is applied outside the timed runs.
+        renderers = {'json[stdlib]': ('stdlib', FastJSONRenderer())}
+        if orjson is not None:
+            renderers['json[orjson]'] = ('orjson', FastJSONRenderer())
+        if MessagePackRenderer.available:
+            renderers['msgpack'] = ('auto', MessagePackRenderer())
+
+        config = compression.compression_settings()
+        results, bodies = {}, {}
+        for name, (encoder, renderer) in renderers.items():
+            with override_settings(TASKS_JSON_ENCODER=encoder):
+                encode_ms, body = self._measure(lambda: renderer.render(page), options['repeat'])
+            bodies[name] = body
+            results[name] = {'tasks': len(page['results']), 'encode_ms': encode_ms, 'encodings': {}}
+            results[name]['encodings']['identity'] = {'bytes': len(body), 'compress_ms': 0.0}
+            for encoding in compression.available_encodings():
+                compress_ms, compressed = self._measure(
+                    lambda: compression.compress(body, encoding, config), options['repeat']
+                )
+                results[name]['encodings'][encoding] = {'bytes': len(compressed), 'compress_ms': compress_ms}
+            for encoding, measured in results[name]['encodings'].items():
+                self.stdout.write(
+                    f"{name:<14} {encoding:<9} encode {encode_ms:9.2f} ms  compress {measured['compress_ms']:9.2f} ms  "
+                    f"{measured['bytes']:>10} bytes"
+                )
+        if 'json[orjson]' in bodies and bodies['json[orjson]'] != bodies['json[stdlib]']:
+            raise CommandError('orjson and the stdlib encoder rendered different JSON.')
+        if options['output']:
+            write_results(options['output'], results)
+
+    def _measure(self, run, repeat):
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            durations.append(time.perf_counter() - started)
+        return round(statistics.median(durations) * 1000, 3), result
@@ -0,0 +1,74 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from tasks.benchmark import seed_data, test_database, write_results
+from tasks.models import Task, UserProfile
+from tasks.rows import TASK_FIELDS, USER_FIELDS, build_rows, columns, parse_fields
+from tasks.serializers import TaskSerializer, UserSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare rows/s of the ModelSerializers and of the values_list() rows used by the read endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='Tasks seeded and serialized per run.')
+        parser.add_argument('--employees', type=int, default=100, help='Employees seeded.')
+        parser.add_argument('--seconds', type=float, default=2.0, help='Duration of each measurement.')
+        parser.add_argument('--fields', default='id,status', help='Field selection measured in addition to all fields.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        with test_database():
+            seed_data(1, options['employees'], max(1, options['tasks'] // options['employees']))
+            tasks = Task.objects.order_by('-created_at', '-id')
+            users = UserProfile.objects.filter(role='employee')
+            self._check_output(tasks, users)
+            fields = parse_fields({'fields': options['fields']}, TASK_FIELDS)
+            cases = {
+                'task_serializer': (lambda: list(tasks), lambda page: TaskSerializer(page, many=True).data),
+                'task_rows': (
+                    lambda: list(tasks.values_list(*columns(TASK_FIELDS))), lambda page: build_rows(TASK_FIELDS, page)
+                ),
+                f'task_rows[{options["fields"]}]': (
+                    lambda: list(tasks.values_list(*columns(fields))), lambda page: build_rows(fields, page)
+                ),
+                'user_serializer': (lambda: list(users), lambda page: UserSerializer(page, many=True).data),
+                'user_rows': (
+                    lambda: list(users.values_list(*columns(USER_FIELDS))), lambda page: build_rows(USER_FIELDS, page)
+                ),
+            }
+            results = {}
+            for name, (fetch, serialize) in cases.items():
+                results[name] = {
+                    'end_to_end': self._rate(lambda: serialize(fetch()), options['seconds']),
+                    'serialize_only': self._rate(lambda page=fetch(): serialize(page), options['seconds']),
+                }
+                self.stdout.write(
+                    f"{name:<28} {results[name]['end_to_end']['rows_per_second']:12.0f} rows/s read and serialized, "
+                    f"{results[name]['serialize_only']['rows_per_second']:12.0f} rows/s serialized "
+                    f"({results[name]['end_to_end']['rows']} rows)"
+                )
+        if options['output']:
+            write_results(options['output'], results)
+
+    def _check_output(self, tasks, users):
+        """
+        Fail unless the rows render to exactly the same JSON as the serializers.
+        """
+        renderer = JSONRenderer()
+        pairs = [
+            (TaskSerializer(tasks, many=True).data, build_rows(TASK_FIELDS, tasks.values_list(*columns(TASK_FIELDS)))),
+            (UserSerializer(users, many=True).data, build_rows(USER_FIELDS, users.values_list(*columns(USER_FIELDS)))),
+        ]
+        for expected, actual in pairs:
+            if renderer.render(expected) != renderer.render(actual):
+                raise CommandError('The rows do not render to the same JSON as the serializers.')
+        self.stdout.write('Output check passed: rows and serializers render to identical JSON.')
+
+    def _rate(self, case, seconds):
+        runs, rows, started = 0, 0, time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            rows += len(case())
+            runs += 1
+        elapsed = time.perf_counter() - started
+        return {'rows': rows // runs, 'runs': runs, 'rows_per_second': round(rows / elapsed, 2)}
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tasks.benchmark import summarize_latencies, write_results
+from todo_app.database import sqlite_init_command
+
+SCHEMA = """
+CREATE TABLE task (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(255) NOT NULL,
+    description TEXT NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    employer_id INTEGER NOT NULL,
+    employee_id INTEGER NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+CREATE INDEX task_employer_created_idx ON task (employer_id, created_at, id);
+"""
+
+# Python's sqlite3 defaults, which is what Django uses without OPTIONS.
+DEFAULT_PROFILE = {'pragmas': {}, 'transaction_mode': 'DEFERRED', 'timeout': 5.0}
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent SQLite read/write throughput with the default journal and with SQLITE_PRAGMAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run.')
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads, like view_tasks requests.')
+        parser.add_argument('--writers', type=int, default=4, help='Writer threads, like update_task_status requests.')
+        parser.add_argument('--rows', type=int, default=50000, help='Tasks seeded before each run.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': DEFAULT_PROFILE,
+            'tuned': {
+                'pragmas': settings.SQLITE_PRAGMAS,
+                'transaction_mode': settings.SQLITE_TRANSACTION_MODE or 'DEFERRED',
+                'timeout': 5.0,
+            },
+        }
+        results = {}
+        for name, profile in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                results[name] = self._run(path, profile, options)
+            summary = results[name]
+            self.stdout.write(
+                f"{name:<8} reads {summary['reads_per_second']:10.1f}/s  writes {summary['writes_per_second']:8.1f}/s  "
+                f"locked errors {summary['locked_errors']:5d}  read p99 {summary['reads']['p99_ms']} ms  "
+                f"write p99 {summary['writes']['p99_ms']} ms"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+
+    def _connect(self, path, profile):
+        connection = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        init_command = sqlite_init_command(profile['pragmas'])
+        for statement in filter(None, (part.strip() for part in init_command.split(';'))):
+            connection.execute(statement)
+        return connection
+
+    def _seed(self, path, profile, rows):
+        connection = self._connect(path, profile)
+        connection.executescript(SCHEMA)
+        now = '2024-01-01 00:00:00'
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO task (title, description, status, employer_id, employee_id, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((f'Task {i}', 'Benchmark task', 'started', i % 10, i % 100, now, now) for i in range(rows)),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def _run(self, path, profile, options):
+        self._seed(path, profile, options['rows'])
+        deadline = time.perf_counter() + options['seconds']
+        reads, writes, errors = [], [], []
+        rows = options['rows']
+
+        def reader(index):
+            connection = self._connect(path, profile)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    connection.execute(
+                        'SELECT * FROM task WHERE employer_id = ? ORDER BY created_at DESC, id DESC LIMIT 100',
+                        (index % 10,),
+                    ).fetchall()
+                    reads.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    errors.append(1)
+            connection.close()
+
+        def writer(index):
+            connection = self._connect(path, profile)
+            task_id = index
+            while time.perf_counter() < deadline:
+                task_id = (task_id * 7919 + 1) % rows + 1
+                started = time.perf_counter()
+                try:
+                    connection.execute(f"BEGIN {profile['transaction_mode']}")
+                    connection.execute('SELECT status FROM task WHERE id = ?', (task_id,)).fetchone()
+                    connection.execute(
+                        "UPDATE task SET status = 'finished', updated_at = datetime('now') WHERE id = ?", (task_id,)
+                    )
+                    connection.execute('COMMIT')
+                    writes.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    errors.append(1)
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+            connection.close()
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'reads_per_second': round(len(reads) / options['seconds'], 1),
+            'writes_per_second': round(len(writes) / options['seconds'], 1),
+            'locked_errors': len(errors),
+            'reads': summarize_latencies(reads),
+            'writes': summarize_latencies(writes),
+        }
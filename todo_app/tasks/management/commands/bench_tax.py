@@ -0,0 +1,77 @@
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from tasks import metrics, tax
+from tasks.benchmark import seed_data, summarize_latencies, test_database, write_results
+
+PASSWORD = 'bench-password-1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Post batches of payroll incomes to tax/ and report requests and incomes per second with the result cache '
+        'cleared before every request (cold) and kept (warm), with the cache hit rate.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per run.')
+        parser.add_argument('--batch', type=int, default=1000, help='Incomes per request.')
+        parser.add_argument('--distinct', type=int, default=200, help='Distinct salaries the incomes are drawn from.')
+        parser.add_argument('--regime', help='Tax regime, the schedule file\'s default when omitted.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        salaries = [rng.randrange(200, 5000) * 1000 for _ in range(options['distinct'])]
+        batches = [
+            [rng.choice(salaries) for _ in range(options['batch'])]
+            for _ in range(options['requests'])
+        ]
+        payload = {'regime': options['regime']} if options['regime'] else {}
+
+        # Every request repeats the same route far beyond the production budgets.
+        with override_settings(TASKS_THROTTLE={'ENABLED': False}), test_database():
+            seeded = seed_data(1, 1, 0, PASSWORD)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Token ' + seeded['tokens'][seeded['employers'][0]])
+            results = {
+                'config': {key: options[key] for key in ('requests', 'batch', 'distinct', 'regime')},
+                'cold': self._run(client, batches, payload, clear=True),
+                'warm': self._run(client, batches, payload, clear=False),
+            }
+
+        self.stdout.write(f"{'run':<8}{'req/s':>10}{'incomes/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'hit rate':>10}")
+        for run in ('cold', 'warm'):
+            summary = results[run]
+            self.stdout.write(
+                f"{run:<8}{summary['requests_per_second']:>10}{summary['incomes_per_second']:>14}"
+                f"{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['hit_rate']:>10}"
+            )
+        if options['output']:
+            write_results(options['output'], results)
+
+    def _run(self, client, batches, payload, clear):
+        cache = tax.get_cache()
+        cache.clear()
+        hits, misses = metrics.TAX_CACHE.value('hit'), metrics.TAX_CACHE.value('miss')
+        latencies = []
+        started = time.perf_counter()
+        for incomes in batches:
+            if clear:
+                cache.clear()
+            request_started = time.perf_counter()
+            response = client.post('/tax/', {**payload, 'incomes': incomes}, format='json')
+            latencies.append(time.perf_counter() - request_started)
+            if response.status_code != 200:
+                raise CommandError(f'POST /tax/ answered {response.status_code}: {response.content[:200]!r}')
+        seconds = time.perf_counter() - started
+        hits = metrics.TAX_CACHE.value('hit') - hits
+        misses = metrics.TAX_CACHE.value('miss') - misses
+        summary = summarize_latencies(latencies)
+        summary['requests_per_second'] = round(len(batches) / seconds, 2)
+        summary['incomes_per_second'] = round(sum(len(incomes) for incomes in batches) / seconds, 2)
+        summary['hit_rate'] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+        return summary
@@ -0,0 +1,67 @@
+import multiprocessing
+import signal
+import threading
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _run_worker(stop, burst):
+    """
+    Entry point of a worker process.
+    :param stop: Event set by the parent process to request a clean shutdown
+    :param burst: Exit once the queue is empty
+    """
+    if not apps.ready:
+        # Process start methods other than fork begin with a fresh interpreter.
+        django.setup()
+    # Ctrl+C reaches the whole process group; let the parent decide when to stop
+    # so the running job is finished instead of interrupted.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from tasks.jobs import work
+    work(stop=stop, burst=burst)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the background jobs queued in the database (employee deletes, task reassignments, exports and '
+        'scheduled archiving) in one or more worker processes. No broker is needed: workers claim jobs '
+        'straight from the Job table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        if processes == 1:
+            stop = threading.Event()
+            self._stop_on_signals(stop)
+            from tasks.jobs import work
+            done = work(stop=stop, burst=options['burst'])
+            self.stdout.write(f'Worker stopped after {done} jobs.')
+            return
+
+        # Children must open their own database connections.
+        connections.close_all()
+        stop = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=_run_worker, args=(stop, options['burst']), name=f'run_jobs-{index}')
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self._stop_on_signals(stop)
+        self.stdout.write(f'Started {processes} worker processes.')
+        for worker in workers:
+            worker.join()
+        self.stdout.write('All workers stopped.')
+
+    def _stop_on_signals(self, stop):
+        def request_stop(signum, frame):
+            self.stdout.write('Finishing the running jobs before stopping...')
+            stop.set()
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
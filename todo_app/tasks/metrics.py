@@ -0,0 +1,229 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+DEFAULT_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    # Bearer token required from the scraper instead of ALLOWED_IPS when set.
+    'TOKEN': None,
+}
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def metrics_settings():
+    """
+    Read the TASKS_METRICS setting merged over the defaults.
+    :return: Dict of metrics settings
+    """
+    return {**DEFAULT_METRICS, **getattr(settings, 'TASKS_METRICS', {})}
+
+
+def scrape_allowed(request):
+    """
+    Decide whether a request may read the metrics. With TASKS_METRICS['TOKEN'] set it must
+    send "Authorization: Bearer <token>". Otherwise REMOTE_ADDR must be in ALLOWED_IPS;
+    behind a reverse proxy REMOTE_ADDR is the proxy's own address for every client, so
+    requests carrying X-Forwarded-For or Forwarded are refused and the proxy needs TOKEN.
+    :param request: Django HttpRequest
+    :return: bool
+    """
+    config = metrics_settings()
+    if config['TOKEN']:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), config['TOKEN'].encode())
+    if 'HTTP_X_FORWARDED_FOR' in request.META or 'HTTP_FORWARDED' in request.META:
+        return False
+    return request.META.get('REMOTE_ADDR') in config['ALLOWED_IPS']
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """
+    Monotonic counter with labels.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labels, label_values)} {value}'
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets and labels, exported as cumulative Prometheus buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: ([*counts], total, count) for labels, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, [('le', bound)])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {count}'
+
+
+class Registry:
+    """
+    Process wide collection of metrics rendered in the Prometheus text format.
+    Each worker process exposes its own values.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DURATION_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labels, buckets)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter('tasks_http_requests_total', 'HTTP requests by route, method and status.', ('route', 'method', 'status'))
+REQUEST_DURATION = registry.histogram('tasks_http_request_duration_seconds', 'Wall time of HTTP requests.', ('route', 'method'))
+DB_QUERIES = registry.histogram('tasks_db_queries_per_request', 'SQL queries issued per request.', ('route',), COUNT_BUCKETS)
+DB_DURATION = registry.histogram('tasks_db_duration_seconds', 'Time spent in SQL queries per request.', ('route',))
+SERIALIZER_DURATION = registry.histogram('tasks_serializer_duration_seconds', 'Time spent serializing per request.', ('route',))
+N_PLUS_ONE = registry.counter('tasks_n_plus_one_total', 'Requests repeating the same SQL statement past the threshold.', ('route',))
+THROTTLE_CHECKS = registry.counter('tasks_throttle_checks_total', 'Requests checked against the throttle budgets.', ('route', 'scope'))
+THROTTLED = registry.counter('tasks_throttled_requests_total', 'Requests rejected by a throttle, by exhausted budget.', ('route', 'scope', 'bucket'))
+TAX_CACHE = registry.counter('tasks_tax_cache_total', 'Incomes of tax requests served from the result cache (hit) or computed (miss).', ('result',))
+COMPRESSION_BYTES = registry.counter('tasks_http_compression_bytes_total', 'Response bytes before and after compression.', ('encoding', 'stage'))
+
+
+class RequestStats:
+    """
+    Measurements collected while one request is being served.
+    """
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'statements')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.statements = {}
+
+    def most_repeated(self):
+        """
+        :return: Tuple of (SQL, count) of the most repeated statement, or (None, 0)
+        """
+        if not self.statements:
+            return None, 0
+        sql = max(self.statements, key=self.statements.get)
+        return sql, self.statements[sql]
+
+
+current_stats = ContextVar('tasks_request_stats', default=None)
+
+
+def record_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper installed on every connection, timing the queries
+    of the request being measured and counting repeated statements.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+        stats.statements[sql] = stats.statements.get(sql, 0) + 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver adding record_queries to each new connection.
+    """
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Attribute the time spent in the enclosed block to serialization.
+    """
+    stats = current_stats.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.serializer_time += time.perf_counter() - started
@@ -0,0 +1,127 @@
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import patch_vary_headers
+from . import compression, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record per route the query count, database time, serializer time and wall time of
+    every request, flag repeated identical queries (N+1 patterns), and report the
+    request's own timings in a Server-Timing header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not metrics.metrics_settings()['ENABLED']:
+            return self.get_response(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        if not metrics.metrics_settings()['ENABLED']:
+            return await self.get_response(request)
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        return self._finish(request, response, stats, started)
+
+    def _start(self):
+        stats = metrics.RequestStats()
+        return stats, metrics.current_stats.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        config = metrics.metrics_settings()
+
+        metrics.REQUESTS.inc(route, request.method, response.status_code)
+        metrics.REQUEST_DURATION.observe(elapsed, route, request.method)
+        metrics.DB_QUERIES.observe(stats.queries, route)
+        metrics.DB_DURATION.observe(stats.db_time, route)
+        metrics.SERIALIZER_DURATION.observe(stats.serializer_time, route)
+
+        sql, repeats = stats.most_repeated()
+        if repeats >= config['N_PLUS_ONE_THRESHOLD']:
+            metrics.N_PLUS_ONE.inc(route)
+            logger.warning('Possible N+1 on %s: statement ran %d times: %s', route, repeats, sql)
+
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                f'serialize;dur={stats.serializer_time * 1000:.2f}, '
+                f'total;dur={elapsed * 1000:.2f}'
+            )
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies of TASKS_COMPRESSION['MIN_SIZE'] bytes or more with brotli
+    (when installed) or gzip, following the client's Accept-Encoding. Streaming
+    responses are left alone: exports compress themselves and event streams must not
+    be buffered.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _compress(self, request, response):
+        config = compression.compression_settings()
+        if not config['ENABLED'] or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not compression.is_compressible(response.get('Content-Type', ''), config):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < config['MIN_SIZE']:
+            return response
+        encoding = compression.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        original = len(response.content)
+        compressed = compression.compress(response.content, encoding, config)
+        if len(compressed) >= original:
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The compressed bytes differ from the identity ones, so the validator becomes weak.
+            response['ETag'] = f'W/{etag}'
+        metrics.COMPRESSION_BYTES.inc(encoding, 'in', amount=original)
+        metrics.COMPRESSION_BYTES.inc(encoding, 'out', amount=len(compressed))
+        return response
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connections, models
+from django.utils import timezone
 from .manager import CustomUserManager
 from django.conf import settings
 
@@ -31,5 +32,137 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employer', 'created_at', 'id'], name='task_employer_created_idx'),
+            models.Index(fields=['employee', 'created_at', 'id'], name='task_employee_created_idx'),
+            models.Index(fields=['employee', 'status', 'created_at'], name='task_employee_status_idx'),
+            models.Index(fields=['employer', 'updated_at', 'id'], name='task_employer_updated_idx'),
+            models.Index(fields=['employee', 'updated_at', 'id'], name='task_employee_updated_idx'),
+            # Covers the per employee and status counts of the stats endpoint.
+            models.Index(fields=['employer', 'employee', 'status'], name='task_employer_stats_idx'),
+            # Finished tasks in the order the archiver moves them out.
+            models.Index(fields=['updated_at', 'id'], name='task_finished_idx', condition=models.Q(status='finished')),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the loaded values so signal handlers can tell what a save changed.
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @classmethod
+    def delete_rows(cls, task_ids, using):
+        """
+        Delete tasks with a single DELETE statement. QuerySet.delete() would load every row
+        and send pre_delete/post_delete for each one, since tasks.signals listens to them;
+        callers create the tombstones, bump the versions and publish the events in bulk
+        instead. No model references a Task, so there is nothing to cascade.
+        :param task_ids: IDs of the tasks to delete
+        :param using: Database alias
+        :return: Number of rows deleted
+        """
+        if not task_ids:
+            return 0
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(task_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote(cls._meta.db_table)} WHERE {quote(cls._meta.pk.column)} IN ({placeholders})',
+                list(task_ids),
+            )
+            return cursor.rowcount
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedTask(models.Model):
+    """
+    Finished task moved out of the Task table by the archiver (tasks.archive). It keeps
+    the ID it had as a Task and is read only.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField()
+    status = models.CharField(max_length=10, choices=Task.STATUS_CHOICES)
+    employer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_employer_tasks')
+    employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_employee_tasks')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employer', 'created_at', 'id'], name='archived_employer_created_idx'),
+            models.Index(fields=['employee', 'created_at', 'id'], name='archived_employee_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class TaskTombstone(models.Model):
+    """
+    Record of a task leaving a user's task list, read by the changes feed.
+    employer_id is empty when the task only left the employee's list because it was reassigned.
+    The owner IDs are plain integers so tombstones outlive the deleted users.
+    """
+    task_id = models.BigIntegerField()
+    employer_id = models.BigIntegerField(null=True, blank=True)
+    employee_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employer_id', 'id'], name='tombstone_employer_idx'),
+            models.Index(fields=['employee_id', 'id'], name='tombstone_employee_idx'),
+        ]
+
+    def __str__(self):
+        return f'Task {self.task_id}'
+
+
+class Job(models.Model):
+    """
+    Background job run by the run_jobs worker command. Workers claim queued jobs with a
+    conditional UPDATE, so the table itself is the queue and no broker is needed.
+    Scheduled maintenance jobs have no owner. pending_key is unique while set, so a job
+    carrying one cannot be queued twice; it is cleared when the job finishes.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    progress = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    pending_key = models.CharField(max_length=100, null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='job_claim_idx'),
+            models.Index(fields=['owner', 'kind', 'status'], name='job_owner_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
@@ -0,0 +1,151 @@
+import base64
+import json
+from datetime import datetime, time
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from .models import Task
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidQuery(ValueError):
+    """
+    Raised when a cursor or a list filter in the query string cannot be parsed.
+    """
+
+
+def encode_cursor(created_at, pk):
+    """
+    Build an opaque cursor pointing at the given (created_at, id) key.
+    :param created_at: Creation time of the last row on the page
+    :param pk: ID of the last row on the page
+    :return: URL safe cursor string
+    """
+    raw = json.dumps([created_at.isoformat(), pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+    :param cursor: Cursor string from the query string
+    :return: Tuple of (created_at, id)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+        if created_at is None or not isinstance(pk, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise InvalidQuery('Invalid cursor.')
+    return created_at, pk
+
+
+def _parse_bound(value, name):
+    """
+    Parse a date or datetime boundary of the created_at range filter.
+    :param value: Raw query string value
+    :param name: Name of the query parameter, used in the error message
+    :return: Aware datetime
+    """
+    # Both parsers return None on malformed values but raise ValueError on well formed
+    # values that are not real dates, e.g. 2024-02-30.
+    try:
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        parsed = day = None
+    if parsed is None:
+        if day is None:
+            raise InvalidQuery(f'Invalid {name}, expected an ISO 8601 date or datetime.')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+def filter_tasks(queryset, params):
+    """
+    Apply the server side list filters (status, created_after, created_before).
+    :param queryset: Task queryset already scoped to the caller
+    :param params: Query string parameters
+    :return: Filtered queryset
+    """
+    task_status = params.get('status')
+    if task_status:
+        if task_status not in dict(Task.STATUS_CHOICES):
+            raise InvalidQuery('Invalid status.')
+        queryset = queryset.filter(status=task_status)
+    if params.get('created_after'):
+        queryset = queryset.filter(created_at__gte=_parse_bound(params['created_after'], 'created_after'))
+    if params.get('created_before'):
+        queryset = queryset.filter(created_at__lt=_parse_bound(params['created_before'], 'created_before'))
+    return queryset
+
+
+def get_page_size(params):
+    """
+    Read the requested page size, bounded by TASKS_MAX_PAGE_SIZE.
+    :param params: Query string parameters
+    :return: Page size
+    """
+    default = getattr(settings, 'TASKS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'TASKS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        limit = int(params.get('limit', default))
+    except ValueError:
+        raise InvalidQuery('Invalid limit.')
+    if limit < 1:
+        raise InvalidQuery('Invalid limit.')
+    return min(limit, maximum)
+
+
+def _page_queryset(queryset, params):
+    """
+    Build the queryset of one keyset page, fetching one extra row to detect the next page.
+    :param queryset: Task queryset already scoped to the caller
+    :param params: Query string parameters
+    :return: Tuple of (sliced queryset, page size)
+    """
+    queryset = filter_tasks(queryset, params)
+    limit = get_page_size(params)
+    cursor = params.get('cursor')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset.order_by('-created_at', '-id')[:limit + 1], limit
+
+
+def _split_page(tasks, limit):
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1].created_at, tasks[-1].id)
+    return tasks, next_cursor
+
+
+def paginate_tasks(queryset, params):
+    """
+    Return one keyset page of tasks, newest first, ordered on (created_at, id).
+    Every page is a bounded range scan over the (owner, created_at, id) indexes.
+    :param queryset: Task queryset already scoped to the caller
+    :param params: Query string parameters
+    :return: Tuple of (list of tasks on the page, cursor of the next page or None)
+    """
+    page, limit = _page_queryset(queryset, params)
+    return _split_page(list(page), limit)
+
+
+async def apaginate_tasks(queryset, params):
+    """
+    Async version of paginate_tasks, reading the page through the async ORM.
+    :param queryset: Task queryset already scoped to the caller
+    :param params: Query string parameters
+    :return: Tuple of (list of tasks on the page, cursor of the next page or None)
+    """
+    page, limit = _page_queryset(queryset, params)
+    return _split_page([task async for task in page], limit)
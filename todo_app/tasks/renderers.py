@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_ENCODERS = ('auto', 'orjson', 'stdlib')
+# Types left to DRF's encoder so they are formatted exactly like JSONRenderer formats them.
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+_LINE_SEPARATORS = (b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+
+
+def json_encoder():
+    """
+    Resolve the TASKS_JSON_ENCODER setting: 'orjson', 'stdlib', or 'auto' for orjson when it is installed.
+    :return: 'orjson' or 'stdlib'
+    """
+    encoder = getattr(settings, 'TASKS_JSON_ENCODER', 'auto')
+    if encoder not in JSON_ENCODERS:
+        raise ImproperlyConfigured(f'TASKS_JSON_ENCODER must be one of {", ".join(JSON_ENCODERS)}.')
+    if encoder == 'orjson' and orjson is None:
+        raise ImproperlyConfigured('TASKS_JSON_ENCODER is orjson but orjson is not installed.')
+    if encoder == 'auto':
+        return 'orjson' if orjson is not None else 'stdlib'
+    return encoder
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when TASKS_JSON_ENCODER allows it. The output parses
+    to the same values as JSONRenderer's compact output, but floats with an exponent are
+    written as 1e16 instead of 1e+16. Indented output and values orjson rejects are left to
+    JSONRenderer. orjson writes NaN and Infinity as null where JSONRenderer rejects them
+    (STRICT_JSON), so views returning floats check them where they are computed, like
+    tax.compute does, rather than having every response walked here.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if json_encoder() == 'stdlib' or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes the two line separators JavaScript does not allow in strings.
+        if _LINE_SEPARATORS[0] in ret or _LINE_SEPARATORS[1] in ret:
+            ret = ret.replace(_LINE_SEPARATORS[0], b'\\u2028').replace(_LINE_SEPARATORS[1], b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Render responses as MessagePack for clients sending Accept: application/msgpack.
+    Values without a MessagePack type are converted like JSONRenderer converts them.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    available = msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
+
+
+class InstalledContentNegotiation(DefaultContentNegotiation):
+    """
+    Content negotiation ignoring the renderers and parsers whose optional dependency is
+    not installed, so they can stay listed in the REST_FRAMEWORK settings.
+    """
+    def select_parser(self, request, parsers):
+        return super().select_parser(request, [parser for parser in parsers if getattr(parser, 'available', True)])
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderers = [renderer for renderer in renderers if getattr(renderer, 'available', True)]
+        return super().select_renderer(request, renderers, format_suffix)
@@ -0,0 +1,68 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_reads = ContextVar('tasks_replica_reads', default=False)
+_primary_reads = ContextVar('tasks_primary_reads', default=False)
+
+
+def replica_aliases():
+    """
+    Return the aliases of the configured read replicas.
+    :return: List of database aliases
+    """
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def read_from_replica(view):
+    """
+    Let the reads of a read-only view go to a replica. Reads anywhere else,
+    including the authentication done before the view runs, stay on the primary.
+    :param view: View function
+    :return: Wrapped view function
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads made inside the block to the primary, even within read_from_replica views.
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads made inside read_from_replica views to a random replica and everything else to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _primary_reads.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,126 @@
+from django.utils import timezone
+from .pagination import InvalidQuery, _page_queryset, encode_cursor
+from .serializers import TaskSerializer, UserSerializer
+
+# Read-only fast path for the list endpoints: rows are read with values_list() and turned
+# into the same dicts, in the same key order, as TaskSerializer and UserSerializer
+# produce, without building model instances or running serializer fields.
+TASK_FIELDS = tuple(TaskSerializer.Meta.fields)
+USER_FIELDS = tuple(
+    field for field in UserSerializer.Meta.fields
+    if not UserSerializer.Meta.extra_kwargs.get(field, {}).get('write_only')
+)
+# Serializer field name -> values_list() column, where they differ.
+COLUMNS = {'employer': 'employer_id', 'employee': 'employee_id'}
+DATETIME_FIELDS = {'created_at', 'updated_at', 'date_joined', 'last_login'}
+
+
+def datetime_formatter():
+    """
+    Build a function formatting datetimes exactly like DRF's DateTimeField: converted to
+    the current time zone, ISO 8601, with UTC written as 'Z'.
+    :return: Function of a datetime or None
+    """
+    current = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        value = value.astimezone(current).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return format_datetime
+
+
+def parse_fields(params, allowed):
+    """
+    Read the ?fields= selection of a list endpoint.
+    :param params: Query string parameters
+    :param allowed: Fields the endpoint can return, in output order
+    :return: Tuple of the selected fields in output order
+    """
+    requested = params.get('fields')
+    if not requested:
+        return allowed
+    names = {name.strip() for name in requested.split(',') if name.strip()}
+    unknown = names.difference(allowed)
+    if unknown or not names:
+        raise InvalidQuery('Invalid fields, expected a comma separated subset of: ' + ', '.join(allowed))
+    return tuple(field for field in allowed if field in names)
+
+
+def columns(fields):
+    """
+    :param fields: Serializer field names
+    :return: Matching values_list() column names
+    """
+    return [COLUMNS.get(field, field) for field in fields]
+
+
+def iter_rows(fields, rows):
+    """
+    Turn values_list() tuples into serializer compatible dicts.
+    :param fields: Field names, in the order of the tuple values; extra trailing values are ignored
+    :param rows: Iterable of tuples
+    :return: Generator of dicts
+    """
+    format_datetime = datetime_formatter()
+    converted = [index for index, field in enumerate(fields) if field in DATETIME_FIELDS]
+    if not converted:
+        for row in rows:
+            yield dict(zip(fields, row))
+        return
+    for row in rows:
+        row = list(row)
+        for index in converted:
+            row[index] = format_datetime(row[index])
+        yield dict(zip(fields, row))
+
+
+def build_rows(fields, rows):
+    """
+    List version of iter_rows.
+    :param fields: Field names, in the order of the tuple values
+    :param rows: Iterable of tuples
+    :return: List of dicts
+    """
+    return list(iter_rows(fields, rows))
+
+
+def _task_page(queryset, params):
+    fields = parse_fields(params, TASK_FIELDS)
+    page, limit = _page_queryset(queryset, params)
+    # The cursor key is always read, after the selected columns, even when not selected.
+    return fields, page.values_list(*columns(fields), 'created_at', 'id'), limit
+
+
+def _split_rows(fields, rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+    return fields, rows, next_cursor
+
+
+def task_page_rows(queryset, params):
+    """
+    Read one keyset page of tasks as tuples, like paginate_tasks, honouring ?fields=.
+    Pass the result to build_rows; the trailing cursor columns are dropped by it.
+    :param queryset: Task queryset already scoped to the caller
+    :param params: Query string parameters
+    :return: Tuple of (selected fields, list of tuples, cursor of the next page or None)
+    """
+    fields, page, limit = _task_page(queryset, params)
+    return _split_rows(fields, list(page), limit)
+
+
+async def atask_page_rows(queryset, params):
+    """
+    Async version of task_page_rows.
+    :param queryset: Task queryset already scoped to the caller
+    :param params: Query string parameters
+    :return: Tuple of (selected fields, list of tuples, cursor of the next page or None)
+    """
+    fields, page, limit = _task_page(queryset, params)
+    return _split_rows(fields, [row async for row in page], limit)
@@ -0,0 +1,198 @@
+import base64
+import json
+import re
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from .models import Task
+from .pagination import InvalidQuery, get_page_size
+
+FTS_TABLE = f'{Task._meta.db_table}_fts'
+POSTGRES_INDEX = 'task_search_idx'
+POSTGRES_CONFIG = 'english'
+# Title matches rank above description matches; the owner column only scopes the search.
+SQLITE_RANK = 'bm25(10.0, 1.0, 0.0)'
+# Number of newest matches ranked by SQLite, see TASKS_SEARCH_MAX_RANKED.
+DEFAULT_MAX_RANKED = 10000
+
+# SQLite keeps an FTS5 index in a contentless virtual table maintained by triggers, so
+# every write path (save, bulk_create, bulk_update, queryset update and delete) stays
+# in sync. The owner column holds one token per user allowed to see the task, which
+# lets the scoping run inside the full-text index instead of after it.
+_OWNER_SQL = "'er' || {row}.employer_id || ' ee' || {row}.employee_id"
+_INSERT_SQL = (
+    f'INSERT INTO {FTS_TABLE}(rowid, title, description, owner) '
+    f'VALUES (new.id, new.title, new.description, {_OWNER_SQL.format(row="new")});'
+)
+_DELETE_SQL = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, owner) "
+    f"VALUES ('delete', old.id, old.title, old.description, {_OWNER_SQL.format(row='old')});"
+)
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"title, description, owner, content='', tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', '{SQLITE_RANK}')",
+    f'CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {Task._meta.db_table} BEGIN {_INSERT_SQL} END',
+    f'CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {Task._meta.db_table} BEGIN {_DELETE_SQL} END',
+    f'CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, description, employer_id, employee_id '
+    f'ON {Task._meta.db_table} BEGIN {_DELETE_SQL} {_INSERT_SQL} END',
+    f'INSERT INTO {FTS_TABLE}(rowid, title, description, owner) '
+    f'SELECT id, title, description, {_OWNER_SQL.format(row=Task._meta.db_table)} FROM {Task._meta.db_table}',
+]
+
+_search_ready = {}
+
+
+def _search_vector():
+    from django.contrib.postgres.search import SearchVector
+    return (
+        SearchVector('title', weight='A', config=POSTGRES_CONFIG)
+        + SearchVector('description', weight='B', config=POSTGRES_CONFIG)
+    )
+
+
+def _sqlite_index_exists(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def install_search_index(using, **kwargs):
+    """
+    post_migrate receiver creating the full-text index of the tasks: an FTS5 table and its
+    triggers on SQLite, a GIN index over the weighted tsvector on PostgreSQL. Existing
+    tasks are indexed when the index is first created.
+    :param using: Database alias that was migrated
+    """
+    if not router.allow_migrate_model(using, Task):
+        return
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        if _sqlite_index_exists(connection):
+            return
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for statement in SQLITE_SCHEMA:
+                cursor.execute(statement)
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Task._meta.db_table)
+        if POSTGRES_INDEX not in constraints:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.add_index(Task, GinIndex(_search_vector(), name=POSTGRES_INDEX))
+    _search_ready.pop(using, None)
+
+
+def search_backend(using):
+    """
+    Name the search implementation available on a database.
+    :param using: Database alias
+    :return: 'fts5', 'postgres' or 'basic'
+    """
+    if using not in _search_ready:
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            _search_ready[using] = 'postgres'
+        elif connection.vendor == 'sqlite' and _sqlite_index_exists(connection):
+            _search_ready[using] = 'fts5'
+        else:
+            _search_ready[using] = 'basic'
+    return _search_ready[using]
+
+
+def search_terms(text):
+    """
+    Split a search query into words, ignoring any query syntax.
+    :param text: Raw query
+    :return: List of words
+    """
+    return re.findall(r'\w+', text)
+
+
+def _encode_offset(offset):
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode()).decode().rstrip('=')
+
+
+def _decode_offset(cursor):
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))['offset']
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError
+    except (ValueError, TypeError, KeyError):
+        raise InvalidQuery('Invalid cursor.')
+    return offset
+
+
+def _fts5_ids(using, owner_token, terms, offset, limit):
+    # Every word must match; quoting them keeps FTS5 query syntax out of user input.
+    phrases = ' '.join(f'"{term}"' for term in terms)
+    match = f'owner:{owner_token} AND {{title description}}: ({phrases})'
+    max_ranked = getattr(settings, 'TASKS_SEARCH_MAX_RANKED', DEFAULT_MAX_RANKED)
+    ids = []
+    with connections[using].cursor() as cursor:
+        # Ranking costs time per match, so very common words only rank the newest matches.
+        # Walking the matches by rowid to find where that window starts needs no ranking.
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT 1 OFFSET %s',
+            [match, max_ranked - 1],
+        )
+        window = cursor.fetchone()
+        if window is None or offset < max_ranked:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid >= %s '
+                f'ORDER BY rank, rowid LIMIT %s OFFSET %s',
+                [match, window[0] if window else 0, limit, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        if window is not None and len(ids) < limit:
+            # The older matches follow the ranked window, newest first, so none is out of reach.
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid < %s '
+                f'ORDER BY rowid DESC LIMIT %s OFFSET %s',
+                [match, window[0], limit - len(ids), max(offset - max_ranked, 0)],
+            )
+            ids += [row[0] for row in cursor.fetchall()]
+    return ids
+
+
+def search_tasks(user, params):
+    """
+    Run a ranked full-text search over the title and description of the tasks the user may see.
+    :param user: Employer or employee
+    :param params: Query string parameters: q, limit and cursor
+    :return: Tuple of (list of tasks, best match first, and the next page cursor or None)
+    """
+    terms = search_terms(params.get('q', ''))
+    if not terms:
+        raise InvalidQuery('q must contain at least one word.')
+    limit = get_page_size(params)
+    offset = _decode_offset(params['cursor']) if params.get('cursor') else 0
+    if user.role == 'employer':
+        tasks, owner_token = Task.objects.filter(employer_id=user.id), f'er{user.id}'
+    else:
+        tasks, owner_token = Task.objects.filter(employee_id=user.id), f'ee{user.id}'
+
+    using = router.db_for_read(Task)
+    backend = search_backend(using)
+    if backend == 'fts5':
+        ids = _fts5_ids(using, owner_token, terms, offset, limit + 1)
+        found = tasks.using(using).in_bulk(ids[:limit])
+        page = [found[task_id] for task_id in ids[:limit] if task_id in found]
+        has_more = len(ids) > limit
+    else:
+        if backend == 'postgres':
+            from django.contrib.postgres.search import SearchQuery, SearchRank
+            query = SearchQuery(' '.join(terms), config=POSTGRES_CONFIG, search_type='websearch')
+            vector = _search_vector()
+            # Filtering on the same expression as the GIN index lets PostgreSQL use it.
+            tasks = tasks.alias(document=vector).filter(document=query).annotate(
+                rank=SearchRank(vector, query)
+            ).order_by('-rank', 'id')
+        else:
+            for term in terms:
+                tasks = tasks.filter(Q(title__icontains=term) | Q(description__icontains=term))
+            tasks = tasks.order_by('-created_at', '-id')
+        page = list(tasks.using(using)[offset:offset + limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+    return page, _encode_offset(offset + limit) if has_more else None
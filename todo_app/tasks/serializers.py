@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Task, UserProfile
+from .models import Job, Task, UserProfile
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,3 +20,39 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = UserProfile.objects.create_user(**validated_data)
         return user
+
+class BulkAddTaskSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField()
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, default='started')
+    employee = serializers.IntegerField()
+
+class BulkEditTaskSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    employee = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if len(attrs) < 2:
+            raise serializers.ValidationError('At least one of title, description, status or employee is required.')
+        return attrs
+
+class BulkTaskStatusSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES)
+
+class ReassignTasksSerializer(serializers.Serializer):
+    from_employee = serializers.IntegerField()
+    to_employee = serializers.IntegerField()
+
+    def validate(self, attrs):
+        if attrs['from_employee'] == attrs['to_employee']:
+            raise serializers.ValidationError('from_employee and to_employee must differ.')
+        return attrs
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'attempts', 'result', 'error', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_tokens, invalidate_user
+from .events import TASK_DELETED, publish_on_commit, task_event_type
+from .models import Task, TaskTombstone, UserProfile
+from .serializers import TaskSerializer
+from .versioning import EMPLOYEES, bump_task_versions, bump_version
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_user_tokens(sender, instance, using, **kwargs):
+    """
+    Drop the cached principal of a user whenever the user row changes or is deleted,
+    before and after the transaction commits.
+    """
+    invalidate_user(instance.pk, using)
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_cached_token(sender, instance, using, **kwargs):
+    """
+    Drop a token from the auth cache whenever it is replaced or deleted, before and after
+    the transaction commits.
+    """
+    invalidate_tokens([instance.key], using)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """
+    Invalidate the cached task lists of the task's employer and employee, and push the
+    change to the employer's event stream. A reassigned task also leaves the list of its
+    previous employee, which gets a tombstone.
+    """
+    employee_ids = [instance.employee_id]
+    loaded_values = getattr(instance, '_loaded_values', {})
+    previous_employee_id = loaded_values.get('employee_id')
+    if previous_employee_id is not None and previous_employee_id != instance.employee_id:
+        employee_ids.append(previous_employee_id)
+        TaskTombstone.objects.create(task_id=instance.id, employee_id=previous_employee_id)
+    publish_on_commit(instance.employer_id, task_event_type(instance, created), TaskSerializer(instance).data)
+    # The saved values are what the next save of this instance is compared against.
+    instance._loaded_values = {
+        field.attname: getattr(instance, field.attname)
+        for field in sender._meta.concrete_fields if field.attname in instance.__dict__
+    }
+    bump_task_versions([instance.employer_id], employee_ids)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    """
+    Invalidate the cached task lists of the task's owners, leave a tombstone for the changes
+    feed and push the deletion to the employer's event stream.
+    """
+    TaskTombstone.objects.create(task_id=instance.id, employer_id=instance.employer_id, employee_id=instance.employee_id)
+    publish_on_commit(instance.employer_id, TASK_DELETED, {'id': instance.id})
+    bump_task_versions([instance.employer_id], [instance.employee_id])
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def bump_employee_list_version(sender, instance, **kwargs):
+    """
+    Invalidate the cached employee list of the employer of a changed employee.
+    """
+    bump_version(EMPLOYEES, instance.employer_id)
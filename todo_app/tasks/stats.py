@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Task
+from .pagination import InvalidQuery
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+STATUSES = [choice for choice, _ in Task.STATUS_CHOICES]
+
+
+def _counts():
+    return {'total': 0, **{task_status: 0 for task_status in STATUSES}}
+
+
+def _parse_days(params):
+    """
+    Read the length of the by_day window.
+    :param params: Query string parameters
+    :return: Number of days
+    """
+    days = params.get('days', DEFAULT_DAYS)
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        raise InvalidQuery('Invalid days, expected a positive integer.')
+    if not 1 <= days <= MAX_DAYS:
+        raise InvalidQuery(f'Invalid days, expected a value between 1 and {MAX_DAYS}.')
+    return days
+
+
+def task_stats(employer, params):
+    """
+    Count an employer's tasks by status, by employee and status, and by creation day and
+    status over the last `days` days. Each breakdown is one grouped query, so the cost
+    depends on the number of groups rather than the number of tasks.
+    :param employer: Employer UserProfile
+    :param params: Query string parameters: days
+    :return: Dict of counts
+    """
+    days = _parse_days(params)
+    tasks = Task.objects.filter(employer=employer)
+
+    totals = _counts()
+    employees = {}
+    for row in tasks.values('employee_id', 'status').annotate(count=Count('id')).order_by():
+        counts = employees.setdefault(row['employee_id'], _counts())
+        for bucket in (counts, totals):
+            bucket[row['status']] = bucket.get(row['status'], 0) + row['count']
+            bucket['total'] += row['count']
+
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    by_day = {since + timedelta(days=offset): _counts() for offset in range(days)}
+    window = tasks.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    for row in window.values('status', day=TruncDate('created_at')).annotate(count=Count('id')).order_by():
+        counts = by_day.get(row['day'])
+        if counts is not None:
+            counts[row['status']] = counts.get(row['status'], 0) + row['count']
+            counts['total'] += row['count']
+
+    return {
+        'total': totals.pop('total'),
+        'by_status': totals,
+        'by_employee': [{'employee': employee_id, **counts} for employee_id, counts in sorted(employees.items())],
+        'days': days,
+        'by_day': [{'date': day.isoformat(), **counts} for day, counts in by_day.items()],
+    }
@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Task, TaskTombstone
+from .pagination import InvalidQuery, get_page_size
+
+DEFAULT_SETTLE_SECONDS = 5
+
+
+def encode_sync_token(updated_at, task_id, tombstone_id):
+    """
+    Build an opaque sync token from the positions reached in both change streams.
+    :param updated_at: updated_at of the last task returned, or None
+    :param task_id: ID of the last task returned, or None
+    :param tombstone_id: ID of the last tombstone returned
+    :return: URL safe token string
+    """
+    position = [updated_at.isoformat() if updated_at else None, task_id, tombstone_id]
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_sync_token(token):
+    """
+    Decode a token produced by encode_sync_token.
+    :param token: Token string from the query string
+    :return: Tuple of (updated_at, task_id, tombstone_id)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        updated_at, task_id, tombstone_id = json.loads(raw)
+        if updated_at is not None:
+            updated_at = parse_datetime(updated_at)
+            if updated_at is None or not isinstance(task_id, int):
+                raise ValueError
+        if not isinstance(tombstone_id, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise InvalidQuery('Invalid sync token.')
+    return updated_at, task_id, tombstone_id
+
+
+def _scopes(user):
+    """
+    Return the task and tombstone filters matching the lists a user can see.
+    :param user: Requesting UserProfile
+    :return: Tuple of (task queryset, tombstone queryset)
+    """
+    if user.role == 'employer':
+        return Task.objects.filter(employer=user), TaskTombstone.objects.filter(employer_id=user.id)
+    return Task.objects.filter(employee=user), TaskTombstone.objects.filter(employee_id=user.id)
+
+
+def settled_before():
+    """
+    updated_at and deleted_at are set before the writing transaction commits, so rows can
+    become visible after rows with a later timestamp or ID were already returned. Only rows
+    older than TASKS_SYNC_SETTLE_SECONDS are returned: their transactions have committed,
+    so the token never moves past a change that can still appear. The setting must exceed
+    the longest write transaction plus the clock skew between the application servers.
+    :return: Rows written before this time are settled
+    """
+    return timezone.now() - timedelta(seconds=getattr(settings, 'TASKS_SYNC_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS))
+
+
+def collect_changes(user, params):
+    """
+    Collect the tasks created, updated or deleted after the position of the `since` token.
+    Tasks are read in (updated_at, id) order and tombstones in id order, each bounded by
+    the page size, so the cost is proportional to the number of changes. Changes newer than
+    the settle window (see settled_before) are left for a later sync.
+    Without a token every current task is returned and old tombstones are skipped.
+    :param user: Requesting UserProfile
+    :param params: Query string parameters
+    :return: Tuple of (changed tasks, deleted task IDs, next token, whether more changes remain)
+    """
+    limit = get_page_size(params)
+    tasks, tombstones = _scopes(user)
+    settled = settled_before()
+    tasks = tasks.filter(updated_at__lte=settled)
+    tombstones = tombstones.filter(deleted_at__lte=settled)
+    since = params.get('since')
+    if since:
+        updated_at, task_id, tombstone_id = decode_sync_token(since)
+        if updated_at is not None:
+            tasks = tasks.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=task_id))
+        deleted = list(tombstones.filter(id__gt=tombstone_id).order_by('id').values_list('id', 'task_id')[:limit + 1])
+    else:
+        updated_at = task_id = None
+        tombstone_id = tombstones.aggregate(last=Max('id'))['last'] or 0
+        deleted = []
+
+    changed = list(tasks.order_by('updated_at', 'id')[:limit + 1])
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    if changed:
+        updated_at, task_id = changed[-1].updated_at, changed[-1].id
+    if deleted:
+        tombstone_id = deleted[-1][0]
+    # A task that is still visible now was re-added after its tombstone, its current state wins.
+    changed_ids = {task.id for task in changed}
+    deleted_ids = sorted({deleted_task_id for _, deleted_task_id in deleted} - changed_ids)
+    return changed, deleted_ids, encode_sync_token(updated_at, task_id, tombstone_id), has_more
@@ -0,0 +1,215 @@
+import importlib.util
+import math
+import reprlib
+import sys
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from . import metrics
+
+DEFAULT_TAX = {
+    # Source file of the calculation engine, Que2Sol.py next to the Django project when None.
+    'ENGINE': None,
+    # Schedule file of the engine, its bundled tax_schedules.json when None.
+    'SCHEDULES': None,
+    'CACHE_SIZE': 100000,
+    'ROUND_TO': 2,
+    'MAX_BATCH': 10000,
+}
+
+
+class InvalidTaxRequest(ValueError):
+    """
+    Raised when the incomes or the schedule of a tax request are invalid.
+    """
+
+
+def tax_settings():
+    """
+    Read the TASKS_TAX setting merged over the defaults.
+    :return: Dict of tax settings
+    """
+    return {**DEFAULT_TAX, **getattr(settings, 'TASKS_TAX', {})}
+
+
+ENGINE_MODULE = 'Que2Sol'
+
+_engine_lock = threading.Lock()
+
+
+def engine():
+    """
+    Load the calculation engine from the file TASKS_TAX['ENGINE'] on first use. It is
+    imported from that path explicitly, without adding its directory to sys.path.
+    :return: The engine module
+    """
+    module = sys.modules.get(ENGINE_MODULE)
+    if module is None:
+        with _engine_lock:
+            module = sys.modules.get(ENGINE_MODULE)
+            if module is None:
+                path = tax_settings()['ENGINE'] or settings.BASE_DIR.parent / 'Que2Sol.py'
+                spec = importlib.util.spec_from_file_location(ENGINE_MODULE, path)
+                module = importlib.util.module_from_spec(spec)
+                # Registered before running it, like the import system does.
+                sys.modules[ENGINE_MODULE] = module
+                try:
+                    spec.loader.exec_module(module)
+                except BaseException:
+                    del sys.modules[ENGINE_MODULE]
+                    raise
+    return module
+
+
+def get_schedule(regime=None, year=None):
+    """
+    :param regime: Name of the tax regime, the schedule file's default when omitted
+    :param year: Financial year, the schedule file's default when omitted
+    :return: Compiled TaxSchedule of the engine
+    """
+    for value in (regime, year):
+        if value is not None and not isinstance(value, str):
+            raise InvalidTaxRequest('Expected the regime and year as strings.')
+    tax_engine = engine()
+    path = tax_settings()['SCHEDULES'] or tax_engine.TAX_SCHEDULES_PATH
+    try:
+        return tax_engine.get_tax_schedule(regime or None, year or None, str(path))
+    except ValueError as e:
+        raise InvalidTaxRequest(str(e)) from None
+
+
+class ResultCache:
+    """
+    Least recently used results of this process, keyed on (schedule, rounded income).
+    Salaries repeat across employees, so most incomes of a payroll are computed once.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if not self.max_size:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process wide result cache sized by TASKS_TAX['CACHE_SIZE'], creating it on first use.
+    :return: ResultCache
+    """
+    global _cache
+    size = tax_settings()['CACHE_SIZE']
+    if _cache is None or _cache.max_size != size:
+        with _cache_lock:
+            if _cache is None or _cache.max_size != size:
+                _cache = ResultCache(size)
+    return _cache
+
+
+def parse_income(value, round_to):
+    """
+    :param value: Income sent by the client, a number or a numeric string
+    :param round_to: Decimal places the income is rounded to
+    :return: The rounded income
+    """
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        try:
+            income = round(float(value), round_to)
+        except (ValueError, TypeError, OverflowError):
+            income = math.nan
+        if math.isfinite(income) and income >= 0:
+            return income
+    raise InvalidTaxRequest(f'Invalid income {reprlib.repr(value)}, expected a non-negative number.')
+
+
+def compute(schedule, income):
+    """
+    :param schedule: TaxSchedule to apply
+    :param income: Rounded income
+    :return: Dict with the total tax and the breakdown of the slabs the income reaches
+    """
+    total_tax = schedule.tax(income)
+    # The JSON renderer does not look for NaN or Infinity, which orjson would write as null.
+    if not math.isfinite(total_tax):
+        raise InvalidTaxRequest(f'The tax of {income} is not a finite number, check the {schedule.regime} schedule.')
+    return {
+        'total_tax': total_tax,
+        'slabs': [
+            {'slab': label, 'amount': amount, 'rate': rate, 'tax': 0.0 if tax == 'Nil' else tax}
+            for label, amount, rate, tax in schedule.breakdown(income)
+        ],
+    }
+
+
+def calculate(schedule, incomes):
+    """
+    Compute the tax of each income, reusing the cached results.
+    :param schedule: TaxSchedule to apply
+    :param incomes: List of rounded incomes
+    :return: List of result dicts, in the order of the incomes
+    """
+    cache = get_cache()
+    results, hits = [], 0
+    for income in incomes:
+        key = (schedule, income)
+        result = cache.get(key)
+        if result is None:
+            result = compute(schedule, income)
+            cache.put(key, result)
+        else:
+            hits += 1
+        results.append({'income': income, **result})
+    metrics.TAX_CACHE.inc('hit', amount=hits)
+    metrics.TAX_CACHE.inc('miss', amount=len(incomes) - hits)
+    return results
+
+
+def calculate_request(data):
+    """
+    Compute the tax of a request body: {"income": x} or {"incomes": [x, ...]}, with an
+    optional "regime" and "year".
+    :param data: Parsed request body
+    :return: Response body
+    """
+    if not isinstance(data, dict):
+        raise InvalidTaxRequest('Expected an object with "income" or "incomes".')
+    config = tax_settings()
+    schedule = get_schedule(data.get('regime'), data.get('year'))
+    body = {'regime': schedule.regime, 'year': schedule.year}
+    if 'incomes' in data:
+        values = data['incomes']
+        if not isinstance(values, list) or not values or len(values) > config['MAX_BATCH']:
+            raise InvalidTaxRequest(f'Expected a non-empty list of at most {config["MAX_BATCH"]} incomes.')
+        incomes = []
+        for index, value in enumerate(values):
+            try:
+                incomes.append(parse_income(value, config['ROUND_TO']))
+            except InvalidTaxRequest as e:
+                raise InvalidTaxRequest(f'incomes[{index}]: {e}') from None
+        body['results'] = calculate(schedule, incomes)
+        return body
+    if 'income' not in data:
+        raise InvalidTaxRequest('Expected an object with "income" or "incomes".')
+    body.update(calculate(schedule, [parse_income(data['income'], config['ROUND_TO'])])[0])
+    return body
@@ -0,0 +1,270 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+from . import metrics
+
+DEFAULT_THROTTLE = {
+    'ENABLED': True,
+    'STORE': 'tasks.throttling.MemoryStore',
+    'CACHE': 'default',
+    'MAX_KEYS': 100000,
+    # Budget of one user on one route, by scope.
+    'RATES': {'list': '120/min', 'write': '60/min', 'login': '10/min'},
+    # Budget shared by an employer and all their employees on one route, by scope.
+    'TENANT_RATES': {'list': '600/min', 'write': '300/min'},
+}
+
+LIST = 'list'
+WRITE = 'write'
+LOGIN = 'login'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def throttle_settings():
+    """
+    Read the TASKS_THROTTLE setting merged over the defaults.
+    :return: Dict of throttle settings
+    """
+    return {**DEFAULT_THROTTLE, **getattr(settings, 'TASKS_THROTTLE', {})}
+
+
+def parse_rate(rate):
+    """
+    Parse a rate in DRF's format, e.g. '120/min'.
+    :param rate: Rate string, or None for no limit
+    :return: Tuple of (number of requests, period in seconds), or None
+    """
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class BaseStore:
+    """
+    Storage of the throttle budgets. Replace MemoryStore through TASKS_THROTTLE['STORE']
+    with CacheStore, or another implementation, to share the budgets between processes.
+    """
+    def consume(self, key, limit, period):
+        """
+        Spend one request of a budget.
+        :param key: Budget key
+        :param limit: Requests allowed per period
+        :param period: Period in seconds
+        :return: 0 when the request is allowed, otherwise the seconds until it would be
+        """
+        raise NotImplementedError
+
+    def refund(self, key, limit, period):
+        """
+        Give back one request spent on a budget, when another budget rejected the request.
+        :param key: Budget key
+        :param limit: Requests allowed per period
+        :param period: Period in seconds
+        """
+        raise NotImplementedError
+
+
+class MemoryStore(BaseStore):
+    """
+    Token buckets kept in this process: each budget holds up to `limit` tokens refilled
+    evenly over `period`, so short bursts pass while the average rate is enforced. The
+    least recently used buckets are dropped past TASKS_THROTTLE['MAX_KEYS'].
+    """
+    def __init__(self):
+        self.max_keys = throttle_settings()['MAX_KEYS']
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, period):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * limit / period)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) * period / limit
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key, limit, period):
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(limit, tokens + 1), updated)
+
+
+class CacheStore(BaseStore):
+    """
+    Sliding window counters in the Django cache named by TASKS_THROTTLE['CACHE'], shared
+    by every process using that cache. The previous window's count is weighted by how
+    much of it still overlaps the sliding window. Counters change with the cache's
+    atomic incr/decr, so use a cache where they are atomic (Redis, Memcached).
+    """
+    def __init__(self):
+        self.cache = caches[throttle_settings()['CACHE']]
+
+    def consume(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        elapsed = now - window * period
+        current_key = f'tasks:throttle:{key}:{window}'
+        self.cache.add(current_key, 0, period * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # The counter expired or was evicted between add and incr.
+            self.cache.set(current_key, 1, period * 2)
+            current = 1
+        previous = self.cache.get(f'tasks:throttle:{key}:{window - 1}', 0)
+        weight = 1 - elapsed / period
+        excess = previous * weight + current - limit
+        if excess <= 0:
+            return 0.0
+        # Rejected requests do not spend the budget.
+        self.cache.decr(current_key)
+        if previous and excess < previous * weight:
+            # The weighted previous count decays by previous / period every second.
+            return excess * period / previous
+        return period - elapsed
+
+    def refund(self, key, limit, period):
+        try:
+            self.cache.decr(f'tasks:throttle:{key}:{int(time.time() // period)}')
+        except ValueError:
+            # The counter expired, so there is nothing left to give back.
+            pass
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Return the process wide store configured by TASKS_THROTTLE['STORE'], creating it on first use.
+    :return: BaseStore instance
+    """
+    path = throttle_settings()['STORE']
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = import_string(path)()
+    return store
+
+
+def _route(request):
+    match = request.resolver_match
+    return match.route if match else 'unmatched'
+
+
+def tenant_id(user):
+    """
+    :param user: Authenticated user or cached principal
+    :return: ID of the employer the user's requests are accounted to
+    """
+    if user.role == 'employer' or user.employer_id is None:
+        return user.id
+    return user.employer_id
+
+
+def check_budgets(scope, route, buckets):
+    """
+    Spend one request of each budget in turn, stopping at the first one exhausted. The
+    budgets spent before it are refunded, so rejected requests cost no budget.
+    :param scope: LIST, WRITE or LOGIN
+    :param route: Route pattern the budgets apply to
+    :param buckets: List of (bucket name, key, rate) tuples
+    :return: 0 when the request is allowed, otherwise the seconds to wait
+    """
+    store = get_store()
+    metrics.THROTTLE_CHECKS.inc(route, scope)
+    spent = []
+    for bucket, key, rate in buckets:
+        parsed = parse_rate(rate)
+        if parsed is None:
+            continue
+        budget_key = f'{scope}:{route}:{bucket}:{key}'
+        wait = store.consume(budget_key, *parsed)
+        if wait:
+            for spent_key, spent_rate in spent:
+                store.refund(spent_key, *spent_rate)
+            metrics.THROTTLED.inc(route, scope, bucket)
+            return wait
+        spent.append((budget_key, parsed))
+    return 0.0
+
+
+def request_wait(request):
+    """
+    Apply the per user and per tenant budgets of a request's route: reads spend the
+    'list' budgets, other methods the 'write' budgets.
+    :param request: Request with an authenticated user
+    :return: 0 when the request is allowed, otherwise the seconds to wait
+    """
+    config = throttle_settings()
+    if not config['ENABLED']:
+        return 0.0
+    scope = LIST if request.method in SAFE_METHODS else WRITE
+    user = request.user
+    return check_budgets(scope, _route(request), [
+        ('user', user.id, config['RATES'].get(scope)),
+        ('tenant', tenant_id(user), config['TENANT_RATES'].get(scope)),
+    ])
+
+
+def retry_after(wait):
+    """
+    :param wait: Seconds to wait
+    :return: Retry-After header value, in whole seconds
+    """
+    return str(max(1, math.ceil(wait)))
+
+
+class TenantRateThrottle(BaseThrottle):
+    """
+    Rate limit authenticated requests per user and per tenant (an employer together with
+    their employees) on every route, so one noisy tenant cannot starve the others.
+    """
+    def allow_request(self, request, view):
+        self.wait_seconds = 0.0
+        if not request.user or not request.user.is_authenticated:
+            return True
+        self.wait_seconds = request_wait(request)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginRateThrottle(BaseThrottle):
+    """
+    Rate limit login attempts per phone number and client address with the 'login' budget.
+    Keying on the address alone would lock out every user of an office behind one NAT or
+    proxy when they all log in at the start of a shift.
+    """
+    def allow_request(self, request, view):
+        self.wait_seconds = 0.0
+        config = throttle_settings()
+        if config['ENABLED']:
+            data = request.data
+            phone_number = data.get('phone_number') if isinstance(data, dict) else None
+            self.wait_seconds = check_budgets(LOGIN, _route(request), [
+                ('client', f'{str(phone_number or "")[:32]}@{self.get_ident(request)}', config['RATES'].get(LOGIN)),
+            ])
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
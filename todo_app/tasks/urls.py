@@ -1,16 +1,32 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('login/', views.login),
     path('tasks/', views.view_tasks),
     path('tasks/add/', views.add_task),
+    path('tasks/export/', views.export_tasks),
+    path('tasks/changes/', views.task_changes),
+    path('tasks/search/', views.search_tasks),
+    path('tasks/stats/', views.task_stats),
     path('tasks/<int:task_id>/edit/', views.edit_task),
     path('tasks/<int:task_id>/delete/', views.delete_task),
     path('tasks/<int:task_id>/status/', views.update_task_status),
     path('tasks/employee/', views.view_employee_tasks),
+    path('tasks/bulk/add/', views.bulk_add_tasks),
+    path('tasks/bulk/edit/', views.bulk_edit_tasks),
+    path('tasks/bulk/status/', views.bulk_update_task_status),
+    path('tasks/reassign/', views.reassign_tasks),
+    path('jobs/<int:job_id>/', views.job_status),
+    path('jobs/<int:job_id>/download/', views.job_download),
     path('employees/add/', views.add_employee, name='add_employee'),
     path('employees/<int:employee_id>/delete/', views.delete_employee, name='delete_employee'),
     path('employees/<int:employee_id>/edit/', views.edit_employee, name='edit_employee'),
     path('employees/', views.view_employees, name='view_employees'),
+    path('async/tasks/', async_views.view_tasks),
+    path('async/tasks/employee/', async_views.view_employee_tasks),
+    path('async/tasks/<int:task_id>/status/', async_views.update_task_status),
+    path('events/tasks/', async_views.task_events),
+    path('tax/', views.calculate_tax),
+    path('metrics', views.metrics),
 ]
@@ -0,0 +1,157 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+from .routers import primary_reads
+
+# Version scopes, each keyed by the ID of the user owning the list.
+EMPLOYER_TASKS = 'employer_tasks'
+EMPLOYEE_TASKS = 'employee_tasks'
+EMPLOYEES = 'employees'
+
+DEFAULT_RESPONSE_CACHE = {
+    # Entry of CACHES shared by all workers; versioning is off when None.
+    'CACHE': None,
+    'TIMEOUT': 60,
+}
+
+
+def _response_cache_settings():
+    """
+    Read the TASKS_RESPONSE_CACHE setting merged over the defaults.
+    :return: Dict of cache settings
+    """
+    return {**DEFAULT_RESPONSE_CACHE, **getattr(settings, 'TASKS_RESPONSE_CACHE', {})}
+
+
+def _cache():
+    """
+    Return the cache holding the version counters and bodies, or None when versioning is
+    off. A version bumped in one process must be seen by every other one, or they keep
+    answering 304 and serving cached bodies for lists that changed; per process caches
+    (local memory, dummy) are therefore never used.
+    :return: Django cache or None
+    """
+    alias = _response_cache_settings()['CACHE']
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return None
+    return cache
+
+
+def _version_key(scope, owner_id):
+    return f'tasks:version:{scope}:{owner_id}'
+
+
+def get_version(cache, scope, owner_id):
+    """
+    Return the current version of a list, initialising it if the cache lost it.
+    A fresh version starts from the current time so it never collides with an ETag
+    handed out before the counter was evicted.
+    :param cache: Cache returned by _cache
+    :param scope: One of the version scopes
+    :param owner_id: ID of the user owning the list
+    :return: Version number
+    """
+    key = _version_key(scope, owner_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(cache, scope, owner_id):
+    key = _version_key(scope, owner_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_version(scope, owner_id):
+    """
+    Invalidate the cached responses and ETags of a list once the current transaction commits.
+    :param scope: One of the version scopes
+    :param owner_id: ID of the user owning the list
+    """
+    cache = _cache()
+    if cache is not None and owner_id is not None:
+        transaction.on_commit(lambda: _bump(cache, scope, owner_id))
+
+
+def bump_task_versions(employer_ids=(), employee_ids=()):
+    """
+    Invalidate the task lists of the given employers and employees.
+    :param employer_ids: Iterable of employer IDs
+    :param employee_ids: Iterable of employee IDs
+    """
+    for employer_id in set(employer_ids):
+        bump_version(EMPLOYER_TASKS, employer_id)
+    for employee_id in set(employee_ids):
+        bump_version(EMPLOYEE_TASKS, employee_id)
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def versioned_response(scope, daily=False):
+    """
+    Serve a list view through its version counter: answer 304 Not Modified when the
+    client already holds the current version, otherwise reuse the body cached for
+    that version and only run the view on a miss. Without a shared cache the view
+    always runs and no ETag is sent.
+    :param scope: One of the version scopes, keyed by the requesting user
+    :param daily: Whether the body also depends on the current date, so it expires at midnight
+    :return: View decorator
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            cache = _cache()
+            if cache is None:
+                return view(request, *args, **kwargs)
+            version = get_version(cache, scope, request.user.id)
+            fingerprint = f'{scope}:{request.user.id}:{version}:{request.accepted_media_type}:{request.get_full_path()}'
+            if daily:
+                fingerprint += f':{timezone.localdate().isoformat()}'
+            digest = hashlib.md5(fingerprint.encode()).hexdigest()
+            etag = f'"{digest}"'
+
+            if _etag_matches(request, etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                body_key = f'tasks:body:{digest}'
+                data = cache.get(body_key)
+                if data is not None:
+                    response = Response(data)
+                else:
+                    # The body is cached under the version read above, which every committed
+                    # write has bumped, so it is read from the primary: a lagging replica
+                    # would have it cached as current until the next write.
+                    with primary_reads():
+                        response = view(request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    cache.set(body_key, response.data, _response_cache_settings()['TIMEOUT'])
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ('Authorization',))
+            return response
+        return wrapper
+    return decorator
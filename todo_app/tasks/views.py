@@ -1,15 +1,36 @@
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from rest_framework.authtoken.models import Token
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Task, UserProfile
-from .serializers import TaskSerializer, UserSerializer, AddTaskSerializer
+from rest_framework.authtoken.models import Token
+from .models import Job, Task, TaskTombstone, UserProfile
+from .serializers import (
+    TaskSerializer, AddTaskSerializer, BulkAddTaskSerializer, BulkEditTaskSerializer,
+    BulkTaskStatusSerializer, JobSerializer, ReassignTasksSerializer,
+)
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import authenticate
 from rest_framework.permissions import IsAuthenticated
+from .login import LoginBusy, login_user
+from .metrics import registry, scrape_allowed, serializer_timer
+from .events import TASK_CREATED, TASK_STATUS, publish_many_on_commit, task_event_type
+from .export import EXPORT_FORMATS, stream_tasks
+from .jobs import DELETE_EMPLOYEE, EXPORT_TASKS, REASSIGN_TASKS, enqueue, export_path, pending_job
+from .archive import task_model
+from .pagination import InvalidQuery, filter_tasks
+from .rows import USER_FIELDS, build_rows, columns, parse_fields, task_page_rows
+from .search import search_tasks as run_search
+from .stats import task_stats as count_tasks
+from .sync import collect_changes
+from .tax import InvalidTaxRequest, calculate_request
+from .throttling import LoginRateThrottle
 from .permission import IsEmployer, IsEmployee
-from rest_framework.decorators import permission_classes
+from .routers import read_from_replica
+from .versioning import EMPLOYEE_TASKS, EMPLOYEES, EMPLOYER_TASKS, bump_task_versions, versioned_response
+from rest_framework.decorators import permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 
 @api_view(['POST'])
@@ -70,29 +91,136 @@ def delete_task(request, task_id):
     except UserProfile.DoesNotExist:
         return Response({'error': 'Task not found or you do not have permission to delete this Task.'}, status=status.HTTP_404_NOT_FOUND)
 
+def _task_page_response(request, **owner):
+    """
+    Serialize one keyset page of the requesting user's tasks, or of their archived tasks with archived=1.
+    :param request: User Request Object
+    :param owner: Lookup scoping the tasks to the requesting user
+    :return: Response Json Object
+    """
+    try:
+        tasks = task_model(request.query_params).objects.filter(**owner)
+        fields, page, next_cursor = task_page_rows(tasks, request.query_params)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    with serializer_timer():
+        results = build_rows(fields, page)
+    return Response({'next_cursor': next_cursor, 'results': results})
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsEmployer])
+@versioned_response(EMPLOYER_TASKS)
+@read_from_replica
 def view_tasks(request):
     """
-    Allow an Employer to view all the task they created
-    :param request:
-    :return:
+    Allow an Employer to view the tasks they created, one cursor page at a time.
+    Supports the status, created_after, created_before, limit, cursor, fields and archived query parameters.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    return _task_page_response(request, employer=request.user)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+@versioned_response(EMPLOYER_TASKS, daily=True)
+@read_from_replica
+def task_stats(request):
+    """
+    Allow an Employer to view the counts of their tasks by status, by employee and by day.
+    Supports the days query parameter (length of the by_day window, 30 by default).
+    :param request: User Request Object
+    :return: Response Json Object
     """
-    tasks = Task.objects.filter(employer=request.user)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data)
+    try:
+        stats = count_tasks(request.user, request.query_params)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(stats)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def export_tasks(request):
+    """
+    Allow an Employer to export all the tasks they created as a stream.
+    Supports output=ndjson|csv, gzip=1 and the same filters as view_tasks. With background=1
+    the export is written by a job instead and downloaded from jobs/<id>/download/.
+    :param request: User Request Object
+    :return: Streaming Response
+    """
+    output = request.query_params.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        return Response({'error': 'Invalid output, expected one of: ' + ', '.join(EXPORT_FORMATS)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        tasks = filter_tasks(Task.objects.filter(employer=request.user), request.query_params)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    compress = request.query_params.get('gzip') in ('1', 'true')
+    if request.query_params.get('background') in ('1', 'true'):
+        filters = {key: request.query_params[key] for key in ('status', 'created_after', 'created_before') if key in request.query_params}
+        job = enqueue(EXPORT_TASKS, request.user, {'output': output, 'gzip': compress, 'filters': filters})
+        return _job_response(job)
+    filename = f'tasks.{output}'
+    content_type = EXPORT_FORMATS[output]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(stream_tasks(tasks.order_by('created_at', 'id'), output, compress), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsEmployee])
+@versioned_response(EMPLOYEE_TASKS)
+@read_from_replica
 def view_employee_tasks(request):
     """
-    Allow an Employee to view their Tasks.
+    Allow an Employee to view their Tasks, one cursor page at a time.
+    Supports the same query parameters as view_tasks.
     :param request: User Request Object
     :return: Response Json Object
     """
-    tasks = Task.objects.filter(employee=request.user)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data)
+    return _task_page_response(request, employee=request.user)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer | IsEmployee])
+def task_changes(request):
+    """
+    Allow an Employer or an Employee to fetch the tasks created, updated or deleted since a sync token.
+    Pass the returned `next` token back as `since`; repeat while `has_more` is true.
+    Changes are returned once they are TASKS_SYNC_SETTLE_SECONDS old.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    try:
+        tasks, deleted, next_token, has_more = collect_changes(request.user, request.query_params)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    with serializer_timer():
+        results = TaskSerializer(tasks, many=True).data
+    return Response({
+        'tasks': results,
+        'deleted': deleted,
+        'next': next_token,
+        'has_more': has_more,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer | IsEmployee])
+def search_tasks(request):
+    """
+    Allow a user to search the title and description of their tasks, best match first.
+    Supports the q, limit and cursor query parameters.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    try:
+        tasks, next_cursor = run_search(request.user, request.query_params)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    with serializer_timer():
+        results = TaskSerializer(tasks, many=True).data
+    return Response({'next_cursor': next_cursor, 'results': results})
 
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated, IsEmployee])
@@ -110,8 +238,254 @@ def update_task_status(request, task_id):
         return Response({'status': 'Task status updated'})
     return Response({'error': 'Invalid data'}, status=status.HTTP_400_BAD_REQUEST)
 
+def _bulk_items(request):
+    """
+    Read the list of items of a bulk request, sent either as a JSON array or as {"tasks": [...]}.
+    :param request: User Request Object
+    :return: List of items, or None if the payload is not a non-empty list within TASKS_BULK_MAX_ITEMS
+    """
+    items = request.data.get('tasks') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return None
+    if len(items) > getattr(settings, 'TASKS_BULK_MAX_ITEMS', 1000):
+        return None
+    return items
+
+def _validate_bulk_items(items, serializer_class):
+    """
+    Validate every item of a bulk request, flagging repeated task IDs.
+    :param items: List of raw items
+    :param serializer_class: Serializer used to validate one item
+    :return: Tuple of (list of (index, validated data), list of item errors)
+    """
+    valid, errors, seen_ids = [], [], set()
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+        task_id = serializer.validated_data.get('id')
+        if task_id is not None:
+            if task_id in seen_ids:
+                errors.append({'index': index, 'errors': {'id': ['Duplicate task id in batch.']}})
+                continue
+            seen_ids.add(task_id)
+        valid.append((index, serializer.validated_data))
+    return valid, errors
+
+def _own_employee_ids(employer, employee_ids):
+    """
+    Resolve in a single query which of the given IDs are employees of the employer.
+    :param employer: Employer UserProfile
+    :param employee_ids: Iterable of employee IDs
+    :return: Set of the IDs that belong to the employer
+    """
+    if not employee_ids:
+        return set()
+    return set(UserProfile.objects.filter(
+        id__in=employee_ids, employer=employer, role='employee'
+    ).values_list('id', flat=True))
+
+def _bulk_response(key, done, errors, success_status):
+    """
+    Build the response of a bulk request with one error entry per failed item.
+    :param key: Response key holding the successful results
+    :param done: Successful results
+    :param errors: Item errors
+    :param success_status: Status code to use when no item failed
+    :return: Response Json Object
+    """
+    errors.sort(key=lambda error: error['index'])
+    if not done:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif errors:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = success_status
+    return Response({key: done, 'errors': errors}, status=response_status)
+
+_INVALID_BULK_PAYLOAD = 'Expected a non-empty list of tasks (at most TASKS_BULK_MAX_ITEMS items).'
+_EMPLOYEE_NOT_FOUND = 'Employee not found or not employed by you.'
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def bulk_add_tasks(request):
+    """
+    Allow an Employer to add many tasks in a single transaction.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    items = _bulk_items(request)
+    if items is None:
+        return Response({'error': _INVALID_BULK_PAYLOAD}, status=status.HTTP_400_BAD_REQUEST)
+    valid, errors = _validate_bulk_items(items, BulkAddTaskSerializer)
+    employee_ids = _own_employee_ids(request.user, {data['employee'] for _, data in valid})
+
+    tasks = []
+    for index, data in valid:
+        if data['employee'] not in employee_ids:
+            errors.append({'index': index, 'errors': {'employee': [_EMPLOYEE_NOT_FOUND]}})
+            continue
+        tasks.append(Task(
+            title=data['title'],
+            description=data['description'],
+            status=data['status'],
+            employer=request.user,
+            employee_id=data['employee'],
+        ))
+    if tasks:
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            bump_task_versions([request.user.id], [task.employee_id for task in tasks])
+            publish_many_on_commit([
+                (request.user.id, TASK_CREATED, data) for data in TaskSerializer(tasks, many=True).data
+            ])
+    return _bulk_response('created', AddTaskSerializer(tasks, many=True).data, errors, status.HTTP_201_CREATED)
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def bulk_edit_tasks(request):
+    """
+    Allow an Employer to edit or reassign many tasks in a single transaction.
+    Each item needs the task id and any of title, description, status or employee.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    items = _bulk_items(request)
+    if items is None:
+        return Response({'error': _INVALID_BULK_PAYLOAD}, status=status.HTTP_400_BAD_REQUEST)
+    valid, errors = _validate_bulk_items(items, BulkEditTaskSerializer)
+    employee_ids = _own_employee_ids(request.user, {data['employee'] for _, data in valid if 'employee' in data})
+
+    updated, fields, previous_employee_ids, reassigned = [], {'updated_at'}, set(), []
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = Task.objects.select_for_update().filter(employer=request.user).in_bulk([data['id'] for _, data in valid])
+        for index, data in valid:
+            task = tasks.get(data['id'])
+            if task is None:
+                errors.append({'index': index, 'errors': {'id': ['Task not found or you do not have a permission to edit this task.']}})
+                continue
+            if 'employee' in data:
+                if data['employee'] not in employee_ids:
+                    errors.append({'index': index, 'errors': {'employee': [_EMPLOYEE_NOT_FOUND]}})
+                    continue
+                if data['employee'] != task.employee_id:
+                    reassigned.append(TaskTombstone(task_id=task.id, employee_id=task.employee_id))
+                    previous_employee_ids.add(task.employee_id)
+                task.employee_id = data.pop('employee')
+                fields.add('employee')
+            for field in ('title', 'description', 'status'):
+                if field in data:
+                    setattr(task, field, data[field])
+                    fields.add(field)
+            task.updated_at = now
+            updated.append(task)
+        if updated:
+            Task.objects.bulk_update(updated, sorted(fields))
+            TaskTombstone.objects.bulk_create(reassigned)
+            # Covers both the previous and the new employee of reassigned tasks.
+            bump_task_versions([request.user.id], previous_employee_ids | {task.employee_id for task in updated})
+            publish_many_on_commit([
+                (request.user.id, task_event_type(task), data)
+                for task, data in zip(updated, TaskSerializer(updated, many=True).data)
+            ])
+    return _bulk_response('updated', [task.id for task in updated], errors, status.HTTP_200_OK)
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated, IsEmployee])
+def bulk_update_task_status(request):
+    """
+    Allow an Employee to update the status of many of their tasks in a single transaction.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    items = _bulk_items(request)
+    if items is None:
+        return Response({'error': _INVALID_BULK_PAYLOAD}, status=status.HTTP_400_BAD_REQUEST)
+    valid, errors = _validate_bulk_items(items, BulkTaskStatusSerializer)
+
+    updated = []
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = Task.objects.select_for_update().filter(employee=request.user).in_bulk([data['id'] for _, data in valid])
+        for index, data in valid:
+            task = tasks.get(data['id'])
+            if task is None:
+                errors.append({'index': index, 'errors': {'id': ['Task not found.']}})
+                continue
+            task.status = data['status']
+            task.updated_at = now
+            updated.append(task)
+        if updated:
+            Task.objects.bulk_update(updated, ['status', 'updated_at'])
+            bump_task_versions([task.employer_id for task in updated], [request.user.id])
+            publish_many_on_commit([
+                (task.employer_id, TASK_STATUS, data)
+                for task, data in zip(updated, TaskSerializer(updated, many=True).data)
+            ])
+    return _bulk_response('updated', [task.id for task in updated], errors, status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def reassign_tasks(request):
+    """
+    Allow an Employer to move every task of one employee to another in a background job.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    serializer = ReassignTasksSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    employee_ids = {serializer.validated_data['from_employee'], serializer.validated_data['to_employee']}
+    if _own_employee_ids(request.user, employee_ids) != employee_ids:
+        return Response({'error': _EMPLOYEE_NOT_FOUND}, status=status.HTTP_400_BAD_REQUEST)
+    job = enqueue(REASSIGN_TASKS, request.user, serializer.validated_data)
+    return _job_response(job)
+
+def _job_response(job):
+    """
+    Answer 202 Accepted with the state of a queued job and where to poll it.
+    :param job: Job
+    :return: Response Json Object
+    """
+    response = Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = f'/jobs/{job.id}/'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    """
+    Allow a user to follow one of their background jobs.
+    :param request: User Request Object
+    :param job_id: Job ID
+    :return: Response Json Object
+    """
+    job = get_object_or_404(Job, id=job_id, owner=request.user)
+    return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEmployer])
+def job_download(request, job_id):
+    """
+    Allow an Employer to download the file written by a finished export job.
+    :param request: User Request Object
+    :param job_id: Job ID
+    :return: File Response
+    """
+    job = get_object_or_404(Job, id=job_id, owner=request.user, kind=EXPORT_TASKS)
+    if job.status != Job.SUCCEEDED:
+        return Response({'error': f'Export is {job.status}.'}, status=status.HTTP_409_CONFLICT)
+    try:
+        export_file = open(export_path(job), 'rb')
+    except FileNotFoundError:
+        return Response({'error': 'Export file no longer exists.'}, status=status.HTTP_410_GONE)
+    return FileResponse(export_file, as_attachment=True, filename=job.result['filename'], content_type=job.result['content_type'])
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginRateThrottle])
 def login(request):
     """
     Allow the User to log in and generate or retrieve their Token
@@ -120,10 +494,12 @@ def login(request):
     """
     phone_number = request.data.get('phone_number')
     password = request.data.get('password')
-    user = authenticate(phone_number=phone_number, password=password)
+    try:
+        user, token = login_user(request, phone_number, password)
+    except LoginBusy:
+        return Response({'error': 'Too many logins in progress, please retry shortly.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
 
     if user is not None:
-        token, created = Token.objects.get_or_create(user=user)
         return Response({
             'token': token.key,
             'message': 'Login successful',
@@ -162,17 +538,25 @@ def add_employee(request):
 @permission_classes([IsAuthenticated, IsEmployer])
 def delete_employee(request, employee_id):
     """
-    Allow an employer to delete an employee under them.
+    Allow an employer to delete an employee under them. The employee is deactivated at once
+    and a background job deletes their tasks and account.
     :param request: User Request Object
     :param employee_id: Employee ID
     :return: Response Json Object
     """
     try:
         employee = UserProfile.objects.get(id=employee_id, employer=request.user, role='employee')
-        employee.delete()
-        return Response({'message': 'Employee deleted successfully'}, status=status.HTTP_200_OK)
     except UserProfile.DoesNotExist:
         return Response({'error': 'Employee not found or you do not have permission to delete this employee.'}, status=status.HTTP_404_NOT_FOUND)
+    job = pending_job(DELETE_EMPLOYEE, request.user, employee_id=employee.id)
+    if job is None:
+        with transaction.atomic():
+            # Lock the employee out right away, the job removes their tasks and the account.
+            employee.is_active = False
+            employee.save(update_fields=['is_active'])
+            Token.objects.filter(user=employee).delete()
+            job = enqueue(DELETE_EMPLOYEE, request.user, {'employee_id': employee.id})
+    return _job_response(job)
 
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated, IsEmployer])
@@ -204,12 +588,47 @@ def edit_employee(request, employee_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsEmployer])
+@versioned_response(EMPLOYEES)
+@read_from_replica
 def view_employees(request):
     """
     Allow an employer to view all employees under them.
+    Supports the fields query parameter.
     :param request: User Request Object
     :return: Response Json Object
     """
+    try:
+        fields = parse_fields(request.query_params, USER_FIELDS)
+    except InvalidQuery as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     employees = UserProfile.objects.filter(employer=request.user, role='employee')
-    serializer = UserSerializer(employees, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    employees = list(employees.values_list(*columns(fields)))
+    with serializer_timer():
+        results = build_rows(fields, employees)
+    return Response(results, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def calculate_tax(request):
+    """
+    Calculate the income tax of one income, {"income": x}, or of a batch, {"incomes": [x, ...]},
+    with the slab breakdown. Optional "regime" and "year" pick the tax schedule.
+    :param request: User Request Object
+    :return: Response Json Object
+    """
+    try:
+        body = calculate_request(request.data)
+    except InvalidTaxRequest as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(body)
+
+def metrics(request):
+    """
+    Expose the request metrics of this process in the Prometheus text format.
+    Only answers the scrapers let in by metrics.scrape_allowed.
+    :param request: User Request Object
+    :return: Plain text Response
+    """
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
+from .database import databases_from_env, sqlite_options
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -43,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.middleware.RequestMetricsMiddleware',
+    'tasks.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +80,56 @@ WSGI_APPLICATION = 'todo_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# PRAGMAs run on every new SQLite connection. WAL lets readers proceed while a
+# write is in progress, IMMEDIATE transactions take the write lock up front so
+# busy_timeout applies instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -65536,  # in KiB when negative, i.e. 64 MiB
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
 }
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+
+# Configured from DATABASE_URL, DATABASE_REPLICA_URLS, DATABASE_CONN_MAX_AGE and
+# DATABASE_POOL, see todo_app/database.py. Defaults to the bundled SQLite file.
+DATABASES = databases_from_env(BASE_DIR / 'db.sqlite3', sqlite_options(SQLITE_PRAGMAS, SQLITE_TRANSACTION_MODE))
+
+DATABASE_ROUTERS = ['tasks.routers.PrimaryReplicaRouter']
+
+
+# Password hashing
+# The hasher named by ALGORITHM (argon2, scrypt or pbkdf2) hashes new passwords and
+# rehashes older ones on login; the costs below tune how expensive each login is.
+# argon2 requires the argon2-cffi package.
+
+PASSWORD_HASHER_POLICY = {
+    'ALGORITHM': os.environ.get('PASSWORD_HASHER', 'scrypt'),
+    'PBKDF2_ITERATIONS': 870000,
+    'SCRYPT_WORK_FACTOR': 2 ** 14,
+    'SCRYPT_BLOCK_SIZE': 8,
+    'SCRYPT_PARALLELISM': 1,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 102400,
+    'ARGON2_PARALLELISM': 8,
+}
+
+_POLICY_HASHERS = {
+    'argon2': 'tasks.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'tasks.hashers.TunedScryptPasswordHasher',
+    'pbkdf2': 'tasks.hashers.TunedPBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [_POLICY_HASHERS[PASSWORD_HASHER_POLICY['ALGORITHM']]] + [
+    hasher for algorithm, hasher in _POLICY_HASHERS.items() if algorithm != PASSWORD_HASHER_POLICY['ALGORITHM']
+]
+
+# Concurrent password checks per process (defaults to the CPU count) and how long a
+# login waits for a free slot before answering 503.
+TASKS_LOGIN_MAX_CONCURRENCY = None
+TASKS_LOGIN_QUEUE_TIMEOUT = 2
 
 
 # Password validation
@@ -129,10 +177,149 @@ AUTH_USER_MODEL = 'tasks.UserProfile'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Token-based authentication
+        'tasks.authentication.CachedTokenAuthentication',  # Token-based authentication with a principal cache
         'rest_framework.authentication.SessionAuthentication',  # For Django sessions
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+    'DEFAULT_RENDERER_CLASSES': [
+        'tasks.renderers.FastJSONRenderer',  # JSON, encoded with orjson when installed (see TASKS_JSON_ENCODER)
+        'tasks.renderers.MessagePackRenderer',  # application/msgpack, when msgpack is installed
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'tasks.parsers.MessagePackParser',  # application/msgpack, when msgpack is installed
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Skips the renderers and parsers above whose optional dependency is missing.
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'tasks.renderers.InstalledContentNegotiation',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'tasks.throttling.TenantRateThrottle',  # Per user and per employer budgets, see TASKS_THROTTLE
+    ],
+}
+
+# Rate limits (tasks.throttling), per route. RATES are the budgets of one user and
+# TENANT_RATES the budgets shared by an employer and their employees; 'list' applies to
+# reads, 'write' to other methods and 'login' to login attempts per phone number and
+# client address.
+# MemoryStore keeps token buckets per process; set STORE to 'tasks.throttling.CacheStore'
+# and CACHE to a cache shared by all workers (Redis, Memcached) to enforce them globally.
+TASKS_THROTTLE = {
+    'ENABLED': True,
+    'STORE': 'tasks.throttling.MemoryStore',
+    'CACHE': 'default',
+    'RATES': {'list': '120/min', 'write': '60/min', 'login': '10/min'},
+    'TENANT_RATES': {'list': '600/min', 'write': '300/min'},
+}
+
+# Encoder of tasks.renderers.FastJSONRenderer: 'auto' uses orjson when it is installed,
+# 'stdlib' always uses DRF's json based encoder. Both parse to the same values, but the
+# bytes differ for floats with an exponent (orjson writes 1e16, DRF 1e+16), e.g. very
+# large incomes on tax/. orjson writes NaN and Infinity as null where DRF rejects them;
+# the only floats of the API, the tax results, are checked when they are computed.
+TASKS_JSON_ENCODER = 'auto'
+
+# Response compression done by tasks.middleware.CompressionMiddleware. Bodies smaller
+# than MIN_SIZE bytes are sent as is; brotli is used when installed and accepted.
+TASKS_COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+# Token -> principal cache used by tasks.authentication.CachedTokenAuthentication.
+# SHARED_CACHE names an entry of CACHES shared by all workers; LOCAL_TIMEOUT bounds how
+# long a worker may keep serving a principal that another worker invalidated, i.e. how
+# long a deleted employee or token keeps working on the other workers.
+TASKS_AUTH_CACHE = {
+    'TIMEOUT': 300,
+    'LOCAL_TIMEOUT': 5,
+    'MAX_SIZE': 10000,
+    'SHARED_CACHE': None,
+}
+
+# Version counters and cached bodies of the list endpoints (tasks.versioning), which
+# answer 304 Not Modified to a matching If-None-Match. CACHE names an entry of CACHES
+# shared by all workers (e.g. Redis or Memcached); ETags and cached bodies are off when
+# it is None or a per process cache (local memory, dummy).
+TASKS_RESPONSE_CACHE = {
+    'CACHE': None,
+    'TIMEOUT': 60,
+}
+
+# Per-route request metrics (tasks.middleware.RequestMetricsMiddleware), served in the
+# Prometheus text format at /metrics to direct connections from ALLOWED_IPS, or only to
+# scrapers sending "Authorization: Bearer <TOKEN>" when TOKEN is set. Behind a reverse
+# proxy every client appears to come from the proxy: set TOKEN there.
+TASKS_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'N_PLUS_ONE_THRESHOLD': 5,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+    'TOKEN': os.environ.get('TASKS_METRICS_TOKEN'),
+}
+
+# Background jobs (tasks.jobs) run by `python manage.py run_jobs`. Tasks are deleted and
+# reassigned BATCH_SIZE rows per transaction; a running job whose worker has not reported
+# progress for LEASE_SECONDS is picked up again by another worker. SCHEDULE maps job
+# kinds to the seconds between two runs queued by the workers themselves. Export files
+# are deleted by the clean_exports job EXPORT_RETENTION_DAYS days after they are written.
+TASKS_JOBS = {
+    'BATCH_SIZE': 1000,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 10,
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL': 1.0,
+    'EXPORT_DIR': BASE_DIR / 'exports',
+    'EXPORT_RETENTION_DAYS': 7,
+    'SCHEDULE': {
+        'archive_tasks': 24 * 3600,
+        'clean_exports': 3600,
+    },
+}
+
+# Archiving (tasks.archive): finished tasks not updated for AFTER_DAYS days are moved to
+# the archive table, BATCH_SIZE rows per transaction, and listed with ?archived=1.
+TASKS_ARCHIVE = {
+    'AFTER_DAYS': 90,
+    'BATCH_SIZE': 1000,
+}
+
+# Server-Sent Events of the task changes (tasks.events), served at events/tasks/.
+# The in-process broker only reaches clients connected to the process that made the
+# change; point BROKER at an implementation backed by a shared service when running
+# several processes or the run_jobs workers. It keeps the last REPLAY_SIZE event types
+# and task IDs of an employer for reconnecting clients, and forgets the employer once no
+# client has followed it for IDLE_TIMEOUT seconds.
+TASKS_EVENTS = {
+    'BROKER': 'tasks.events.InProcessBroker',
+    'REPLAY_SIZE': 1000,
+    'QUEUE_SIZE': 1000,
+    'IDLE_TIMEOUT': 300,
+    'KEEPALIVE': 15,
+    'RETRY': 3000,
+}
+
+# Income tax endpoint (tasks.tax), computed by the engine loaded from the ENGINE file.
+# Incomes are rounded to ROUND_TO decimal places and the results of the last CACHE_SIZE
+# (schedule, income) pairs are kept per process; 0 disables the cache.
+TASKS_TAX = {
+    'ENGINE': BASE_DIR.parent / 'Que2Sol.py',
+    'SCHEDULES': None,
+    'CACHE_SIZE': 100000,
+    'ROUND_TO': 2,
+    'MAX_BATCH': 10000,
+}
+
+# Full-text search (tasks.search). On SQLite only the newest TASKS_SEARCH_MAX_RANKED
+# matches of a query are ranked, which bounds the cost of very common words; the older
+# matches follow them, newest first.
+TASKS_SEARCH_MAX_RANKED = 10000
+
+# Changes feed (tasks.sync): rows are returned once they are older than this many seconds,
+# so transactions that commit late are not skipped by a token. Keep it above the longest
+# write transaction plus the clock skew between the application servers.
+TASKS_SYNC_SETTLE_SECONDS = 5